@@ -1,985 +1,2946 @@
-import streamlit as st
-import pymysql
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-from io import BytesIO, StringIO
-from PIL import Image
-
-# ---------------------- 全局配置 ----------------------
-st.set_page_config(page_title="学生成绩管理系统", layout="wide")
-
-# 设置matplotlib中文显示
-plt.rcParams["font.family"] = ["SimHei", "WenQuanYi Micro Hei", "Heiti TC"]
-plt.rcParams['axes.unicode_minus'] = False
-
-# ---------------------- 数据库连接函数 ----------------------
-def connect_db():
-    """连接数据库，返回连接对象"""
-    try:
-        # Sealos云数据库配置
-        conn = pymysql.connect(
-            host="dbconn.sealoshzh.site",  
-            port=40210,         
-            user="root",       
-            password="d7f6x5pf",
-            db="grade_management",
-            charset="utf8mb4"
-        )
-        return conn
-    except Exception as e:
-        st.error(f"数据库连接失败：{str(e)}")
-        st.warning("请检查：1. 云数据库是否正常运行 2. 账号密码/端口是否正确")
-        return None
-
-# ---------------------- 工具函数 ----------------------
-def calculate_gpa(score):
-    """根据分数计算单门课绩点"""
-    score = float(score)
-    if score < 60:
-        return 0.0
-    score -= 60
-    return min(1 + score/10, 4.0) if score < 30 else 4 + (score-30)/10
-
-def validate_score(score):
-    """验证成绩是否合法"""
-    try:
-        score = float(score)
-        if 0 <= score <= 100:
-            return score, True
-        else:
-            st.warning("成绩必须在0-100之间！")
-            return None, False
-    except ValueError:
-        st.warning("成绩必须是数字！")
-        return None, False
-
-# ---------------------- 导出功能函数 ----------------------
-def export_to_excel(data, filename="学生信息"):
-    """导出数据到Excel"""
-    output = BytesIO()
-    df = pd.DataFrame(data)
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='学生信息')
-    output.seek(0)
-    return output
-
-def export_to_csv(data, filename="学生信息"):
-    """导出数据到CSV（备用方案）"""
-    output = StringIO()
-    df = pd.DataFrame(data)
-    df.to_csv(output, index=False, encoding='utf-8-sig')
-    output.seek(0)
-    return output
-
-def generate_score_chart(class_name, course_id, course_name, scores):
-    """生成成绩统计图表"""
-    # 统计成绩分布
-    grade_levels = {"不及格": 0, "及格": 0, "良好": 0, "优秀": 0}
-    total_scores = 0
-    score_count = 0
-    
-    for score in scores:
-        if score is not None:
-            score = float(score)
-            total_scores += score
-            score_count += 1
-            
-            if score < 60:
-                grade_levels["不及格"] += 1
-            elif 60 <= score < 80:
-                grade_levels["及格"] += 1
-            elif 80 <= score < 90:
-                grade_levels["良好"] += 1
-            elif 90 <= score <= 100:
-                grade_levels["优秀"] += 1
-    
-    # 计算统计指标
-    avg_score = round(total_scores / score_count, 2) if score_count > 0 else 0.0
-    total = sum(grade_levels.values())
-    grade_percentages = {k: round(v/total*100, 1) for k, v in grade_levels.items()}
-    
-    # 生成图表
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 6))
-    labels = list(grade_levels.keys())
-    sizes = list(grade_levels.values())
-    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']
-    explode = (0.05, 0, 0, 0)
-    
-    # 饼状图
-    wedges, texts, autotexts = ax1.pie(
-        sizes, 
-        explode=explode,
-        labels=labels,
-        colors=colors,
-        autopct='%1.1f%%',
-        shadow=True,
-        startangle=90
-    )
-    ax1.set_title(f'{class_name}班-{course_name}（{course_id}）成绩等级分布\n(参考人数：{score_count}，平均分：{avg_score})', fontsize=12)
-    
-    # 柱状图
-    ax2.bar(labels, sizes, color=colors)
-    ax2.set_title(f'{class_name}班-{course_name}（{course_id}）各成绩等级人数', fontsize=12)
-    ax2.set_ylabel('学生人数')
-    for i, v in enumerate(sizes):
-        ax2.text(i, v + 0.1, str(v), ha='center', va='bottom')
-    
-    plt.tight_layout()
-    
-    # 保存图表到BytesIO
-    img_buffer = BytesIO()
-    plt.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
-    img_buffer.seek(0)
-    img = Image.open(img_buffer)
-    
-    # 返回图表和统计信息
-    return img, {
-        "class_name": class_name,
-        "course_name": course_name,
-        "course_id": course_id,
-        "student_count": score_count,
-        "avg_score": avg_score,
-        "grade_distribution": grade_levels,
-        "grade_percentages": grade_percentages
-    }
-
-# ---------------------- 登录页面 ----------------------
-def login_page():
-    st.title("📚 学生成绩管理系统 - 登录")
-    st.divider()
-    
-    # 登录表单
-    with st.form("login_form"):
-        username = st.text_input("账号", placeholder="请输入登录账号")
-        password = st.text_input("密码", type="password", placeholder="请输入登录密码")
-        submit_btn = st.form_submit_button("登录", type="primary")
-        
-        if submit_btn:
-            if not (username and password):
-                st.warning("⚠️ 账号和密码不能为空！")
-                return
-            
-            # 连接数据库验证账号密码
-            db = connect_db()
-            if db:
-                cursor = db.cursor()
-                try:
-                    # 查询用户信息
-                    cursor.execute("SELECT * FROM user WHERE username = %s", (username,))
-                    user = cursor.fetchone()
-                    if user:
-                        # 验证密码（明文，适配测试场景）
-                        if user[2] == password:
-                            # 登录成功，保存用户状态
-                            st.session_state["is_login"] = True
-                            st.session_state["username"] = username
-                            st.session_state["role"] = user[3]  # admin/teacher
-                            st.success("✅ 登录成功！正在跳转...")
-                            st.rerun()  # 刷新页面跳主界面
-                        else:
-                            st.error("❌ 密码错误！")
-                    else:
-                        st.error("❌ 账号不存在！")
-                except Exception as e:
-                    st.error(f"登录失败：{str(e)}")
-                finally:
-                    cursor.close()
-                    db.close()
-
-# ---------------------- 主功能页面 ----------------------
-def main_page():
-    # 侧边栏：用户信息 + 退出登录
-    with st.sidebar:
-        st.header(f"当前登录：{st.session_state['username']}")
-        st.caption(f"角色：{st.session_state['role']}")
-        if st.button("退出登录", type="secondary"):
-            st.session_state.clear()
-            st.rerun()
-        st.divider()
-    
-    # 主功能菜单（完整功能）
-    menu = st.selectbox(
-        "请选择功能",
-        [
-            "学生信息查询", "新增学生", "修改学生信息", "删除学生",
-            "课程管理", "成绩管理", "绩点排名", "班级+学科成绩统计"
-        ],
-        index=0
-    )
-    
-    # 1. 学生信息查询（所有人可看）
-    if menu == "学生信息查询":
-        st.subheader("🔍 学生信息+成绩+绩点查询")
-        with st.form("query_form"):
-            stu_id = st.text_input("请输入学生学号", placeholder="例如：2024001")
-            query_btn = st.form_submit_button("查询")
-            
-            if query_btn:
-                if not stu_id:
-                    st.warning("⚠️ 请输入学号！")
-                    return
-                
-                db = connect_db()
-                if db:
-                    cursor = db.cursor()
-                    try:
-                        # 查学生基础信息
-                        cursor.execute("SELECT * FROM student WHERE student_id = %s", (stu_id,))
-                        stu_info = cursor.fetchone()
-                        if not stu_info:
-                            st.info("ℹ️ 未查询到该学生信息！")
-                            return
-                        
-                        # 展示基础信息
-                        col1, col2, col3, col4 = st.columns(4)
-                        col1.metric("学号", stu_info[0])
-                        col2.metric("姓名", stu_info[1])
-                        col3.metric("性别", stu_info[2])
-                        col4.metric("班级", stu_info[3])
-                        st.divider()
-                        
-                        # 查该学生成绩
-                        cursor.execute("""
-                            SELECT c.course_name, sc.score 
-                            FROM score sc
-                            JOIN course c ON sc.course_id = c.course_id
-                            WHERE sc.student_id = %s
-                        """, (stu_id,))
-                        scores = cursor.fetchall()
-                        
-                        # 整理导出数据
-                        export_data = []
-                        # 基础信息行
-                        export_data.append({
-                            "学号": stu_info[0],
-                            "姓名": stu_info[1],
-                            "性别": stu_info[2],
-                            "班级": stu_info[3],
-                            "课程名称": "——",
-                            "成绩": "——",
-                            "绩点": "——"
-                        })
-                        
-                        if scores:
-                            st.subheader("📝 成绩与绩点")
-                            total_gpa = 0.0
-                            course_count = len(scores)
-                            # 整理成绩数据
-                            score_data = []
-                            for course, score in scores:
-                                gpa = calculate_gpa(score)
-                                total_gpa += gpa
-                                score_data.append({
-                                    "课程名称": course,
-                                    "成绩": score,
-                                    "单门绩点": gpa
-                                })
-                                export_data.append({
-                                    "学号": stu_info[0],
-                                    "姓名": "",
-                                    "性别": "",
-                                    "班级": "",
-                                    "课程名称": course,
-                                    "成绩": score,
-                                    "绩点": round(gpa, 1)
-                                })
-                            # 展示表格
-                            st.dataframe(score_data, use_container_width=True)
-                            # 显示平均绩点
-                            avg_gpa = round(total_gpa / course_count, 2)
-                            st.metric("📊 平均绩点", avg_gpa)
-                            # 添加平均绩点到导出数据
-                            export_data.append({
-                                "学号": stu_info[0],
-                                "姓名": "",
-                                "性别": "",
-                                "班级": "",
-                                "课程名称": "平均绩点",
-                                "成绩": "——",
-                                "绩点": avg_gpa
-                            })
-                        else:
-                            st.info("ℹ️ 该学生暂无选课/成绩记录！")
-                            export_data.append({
-                                "学号": stu_info[0],
-                                "姓名": "",
-                                "性别": "",
-                                "班级": "",
-                                "课程名称": "无选课记录",
-                                "成绩": "无成绩",
-                                "绩点": 0.0
-                            })
-                        
-                        # 导出功能
-                        st.divider()
-                        col_export1, col_export2 = st.columns(2)
-                        with col_export1:
-                            # 导出Excel
-                            excel_data = export_to_excel(export_data, f"学生{stu_id}信息")
-                            st.download_button(
-                                label="📥 导出Excel文件",
-                                data=excel_data,
-                                file_name=f"学生{stu_id}信息.xlsx",
-                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                            )
-                        with col_export2:
-                            # 导出CSV（兼容更多设备）
-                            csv_data = export_to_csv(export_data, f"学生{stu_id}信息")
-                            st.download_button(
-                                label="📥 导出CSV文件",
-                                data=csv_data,
-                                file_name=f"学生{stu_id}信息.csv",
-                                mime="text/csv"
-                            )
-                            
-                    except Exception as e:
-                        st.error(f"查询失败：{str(e)}")
-                    finally:
-                        cursor.close()
-                        db.close()
-    
-    # 2. 新增学生（仅管理员可操作）
-    if menu == "新增学生":
-        st.subheader("➕ 新增学生")
-        # 权限判断
-        if st.session_state["role"] != "admin":
-            st.error("❌ 无权限！仅管理员可新增学生")
-            return
-        
-        with st.form("add_stu_form"):
-            col1, col2 = st.columns(2)
-            stu_id = col1.text_input("学号", placeholder="唯一，例如：2024001")
-            stu_name = col2.text_input("姓名", placeholder="例如：张三")
-            stu_gender = col1.selectbox("性别", ["男", "女"])
-            stu_class = col2.text_input("班级", placeholder="例如：计科2401")
-            add_btn = st.form_submit_button("提交新增", type="primary")
-            
-            if add_btn:
-                if not (stu_id and stu_name and stu_gender and stu_class):
-                    st.warning("⚠️ 所有字段不能为空！")
-                    return
-                
-                db = connect_db()
-                if db:
-                    cursor = db.cursor()
-                    try:
-                        # 检查学号是否已存在
-                        cursor.execute("SELECT * FROM student WHERE student_id = %s", (stu_id,))
-                        if cursor.fetchone():
-                            st.error("❌ 学号已存在！")
-                            return
-                        # 新增学生
-                        cursor.execute(
-                            "INSERT INTO student (student_id, name, gender, class) VALUES (%s, %s, %s, %s)",
-                            (stu_id, stu_name, stu_gender, stu_class)
-                        )
-                        db.commit()
-                        st.success("✅ 学生新增成功！")
-                        # 刷新表单
-                        st.rerun()
-                    except Exception as e:
-                        db.rollback()
-                        st.error(f"新增失败：{str(e)}")
-                    finally:
-                        cursor.close()
-                        db.close()
-    
-    # 3. 修改学生信息（仅管理员可操作）
-    if menu == "修改学生信息":
-        st.subheader("✏️ 修改学生信息")
-        # 权限判断
-        if st.session_state["role"] != "admin":
-            st.error("❌ 无权限！仅管理员可修改学生信息")
-            return
-        
-        # 选择修改类型
-        update_type = st.radio("修改类型", ["基础信息", "成绩"])
-        
-        with st.form("update_stu_form"):
-            stu_id = st.text_input("学生学号", placeholder="例如：2024001")
-            
-            if update_type == "基础信息":
-                col1, col2 = st.columns(2)
-                new_name = col1.text_input("新姓名", placeholder="例如：张三")
-                new_gender = col2.selectbox("新性别", ["男", "女"])
-                new_class = col1.text_input("新班级", placeholder="例如：计科2401")
-            else:
-                col1, col2 = st.columns(2)
-                course_id = col1.text_input("课程ID", placeholder="例如：C001")
-                new_score = col2.number_input("新成绩", min_value=0.0, max_value=100.0, step=0.5)
-            
-            update_btn = st.form_submit_button("提交修改", type="primary")
-            
-            if update_btn:
-                if not stu_id:
-                    st.warning("⚠️ 请输入学生学号！")
-                    return
-                
-                db = connect_db()
-                if db:
-                    cursor = db.cursor()
-                    try:
-                        # 检查学生是否存在
-                        cursor.execute("SELECT * FROM student WHERE student_id = %s", (stu_id,))
-                        if not cursor.fetchone():
-                            st.error("❌ 学生不存在！")
-                            return
-                        
-                        if update_type == "基础信息":
-                            if not (new_name and new_gender and new_class):
-                                st.warning("⚠️ 所有基础信息字段不能为空！")
-                                return
-                            # 修改基础信息
-                            cursor.execute(
-                                "UPDATE student SET name = %s, gender = %s, class = %s WHERE student_id = %s",
-                                (new_name, new_gender, new_class, stu_id)
-                            )
-                        else:
-                            if not course_id:
-                                st.warning("⚠️ 课程ID不能为空！")
-                                return
-                            # 验证成绩
-                            score_valid, is_ok = validate_score(new_score)
-                            if not is_ok:
-                                return
-                            # 检查课程是否存在
-                            cursor.execute("SELECT * FROM course WHERE course_id = %s", (course_id,))
-                            if not cursor.fetchone():
-                                st.error("❌ 课程不存在！")
-                                return
-                            # 检查成绩记录是否存在
-                            cursor.execute("SELECT * FROM score WHERE student_id = %s AND course_id = %s", (stu_id, course_id))
-                            if not cursor.fetchone():
-                                st.error("❌ 该学生未选此课程，无成绩可修改！")
-                                return
-                            # 修改成绩
-                            cursor.execute(
-                                "UPDATE score SET score = %s WHERE student_id = %s AND course_id = %s",
-                                (new_score, stu_id, course_id)
-                            )
-                        
-                        db.commit()
-                        if cursor.rowcount > 0:
-                            st.success("✅ 信息修改成功！")
-                        else:
-                            st.info("ℹ️ 无数据被修改！")
-                    except Exception as e:
-                        db.rollback()
-                        st.error(f"修改失败：{str(e)}")
-                    finally:
-                        cursor.close()
-                        db.close()
-    
-    # 4. 删除学生（仅管理员可操作）
-    if menu == "删除学生":
-        st.subheader("🗑️ 删除学生")
-        # 权限判断
-        if st.session_state["role"] != "admin":
-            st.error("❌ 无权限！仅管理员可删除学生")
-            return
-        
-        with st.form("delete_stu_form"):
-            stu_id = st.text_input("请输入要删除的学生学号", placeholder="例如：2024001")
-            # 二次确认（防止误删）
-            confirm_delete = st.checkbox("我确认要删除该学生（会同步删除其成绩）")
-            delete_btn = st.form_submit_button("删除学生", type="primary")
-            
-            if delete_btn:
-                if not stu_id:
-                    st.warning("⚠️ 请输入要删除的学生学号！")
-                    return
-                if not confirm_delete:
-                    st.warning("⚠️ 请勾选确认删除！")
-                    return
-                
-                db = connect_db()
-                if db:
-                    cursor = db.cursor()
-                    try:
-                        # 检查学生是否存在
-                        cursor.execute("SELECT * FROM student WHERE student_id = %s", (stu_id,))
-                        if not cursor.fetchone():
-                            st.error("❌ 该学生不存在！")
-                            return
-                        
-                        # 先删除该学生的成绩（外键关联）
-                        cursor.execute("DELETE FROM score WHERE student_id = %s", (stu_id,))
-                        # 再删除学生信息
-                        cursor.execute("DELETE FROM student WHERE student_id = %s", (stu_id,))
-                        db.commit()
-                        
-                        if cursor.rowcount > 0:
-                            st.success("✅ 学生删除成功（含关联成绩）！")
-                        else:
-                            st.info("ℹ️ 无学生数据被删除！")
-                        # 刷新表单
-                        st.rerun()
-                    except Exception as e:
-                        db.rollback()
-                        st.error(f"删除失败：{str(e)}")
-                    finally:
-                        cursor.close()
-                        db.close()
-    
-    # 5. 课程管理（仅管理员可操作）
-    if menu == "课程管理":
-        st.subheader("📚 课程管理")
-        # 权限判断
-        if st.session_state["role"] != "admin":
-            st.error("❌ 无权限！仅管理员可管理课程")
-            return
-        
-        # 课程管理子菜单
-        course_submenu = st.radio("课程操作", ["新增课程", "修改课程", "删除课程"])
-        
-        # 5.1 新增课程
-        if course_submenu == "新增课程":
-            with st.form("add_course_form"):
-                col1, col2, col3 = st.columns(3)
-                course_id = col1.text_input("课程ID", placeholder="例如：C001")
-                course_name = col2.text_input("课程名称", placeholder="例如：Python程序设计")
-                credit = col3.number_input("学分", min_value=1, max_value=10, step=1)
-                add_course_btn = st.form_submit_button("新增课程", type="primary")
-                
-                if add_course_btn:
-                    if not (course_id and course_name):
-                        st.warning("⚠️ 课程ID和名称不能为空！")
-                        return
-                    
-                    db = connect_db()
-                    if db:
-                        cursor = db.cursor()
-                        try:
-                            # 检查课程ID是否已存在
-                            cursor.execute("SELECT * FROM course WHERE course_id = %s", (course_id,))
-                            if cursor.fetchone():
-                                st.error("❌ 课程ID已存在！")
-                                return
-                            # 新增课程
-                            cursor.execute(
-                                "INSERT INTO course (course_id, course_name, credit) VALUES (%s, %s, %s)",
-                                (course_id, course_name, credit)
-                            )
-                            db.commit()
-                            st.success("✅ 课程新增成功！")
-                        except Exception as e:
-                            db.rollback()
-                            st.error(f"新增失败：{str(e)}")
-                        finally:
-                            cursor.close()
-                            db.close()
-        
-        # 5.2 修改课程
-        elif course_submenu == "修改课程":
-            with st.form("update_course_form"):
-                col1, col2, col3 = st.columns(3)
-                course_id = col1.text_input("课程ID", placeholder="例如：C001")
-                new_course_name = col2.text_input("新课程名称", placeholder="例如：Python程序设计")
-                new_credit = col3.number_input("新学分", min_value=1, max_value=10, step=1)
-                update_course_btn = st.form_submit_button("修改课程", type="primary")
-                
-                if update_course_btn:
-                    if not (course_id and new_course_name):
-                        st.warning("⚠️ 课程ID和新名称不能为空！")
-                        return
-                    
-                    db = connect_db()
-                    if db:
-                        cursor = db.cursor()
-                        try:
-                            # 检查课程是否存在
-                            cursor.execute("SELECT * FROM course WHERE course_id = %s", (course_id,))
-                            if not cursor.fetchone():
-                                st.error("❌ 课程不存在！")
-                                return
-                            # 修改课程
-                            cursor.execute(
-                                "UPDATE course SET course_name = %s, credit = %s WHERE course_id = %s",
-                                (new_course_name, new_credit, course_id)
-                            )
-                            db.commit()
-                            if cursor.rowcount > 0:
-                                st.success("✅ 课程修改成功！")
-                            else:
-                                st.info("ℹ️ 无数据被修改！")
-                        except Exception as e:
-                            db.rollback()
-                            st.error(f"修改失败：{str(e)}")
-                        finally:
-                            cursor.close()
-                            db.close()
-        
-        # 5.3 删除课程
-        elif course_submenu == "删除课程":
-            with st.form("delete_course_form"):
-                course_id = st.text_input("课程ID", placeholder="例如：C001")
-                confirm_delete = st.checkbox("我确认要删除该课程")
-                delete_course_btn = st.form_submit_button("删除课程", type="primary")
-                
-                if delete_course_btn:
-                    if not course_id:
-                        st.warning("⚠️ 请输入课程ID！")
-                        return
-                    if not confirm_delete:
-                        st.warning("⚠️ 请勾选确认删除！")
-                        return
-                    
-                    db = connect_db()
-                    if db:
-                        cursor = db.cursor()
-                        try:
-                            # 检查课程是否存在
-                            cursor.execute("SELECT * FROM course WHERE course_id = %s", (course_id,))
-                            if not cursor.fetchone():
-                                st.error("❌ 课程不存在！")
-                                return
-                            # 删除课程
-                            cursor.execute("DELETE FROM course WHERE course_id = %s", (course_id,))
-                            db.commit()
-                            if cursor.rowcount > 0:
-                                st.success("✅ 课程删除成功！")
-                            else:
-                                st.info("ℹ️ 无课程数据被删除！")
-                        except Exception as e:
-                            db.rollback()
-                            st.error(f"删除失败：{str(e)}")
-                        finally:
-                            cursor.close()
-                            db.close()
-    
-    # 6. 成绩管理（仅管理员可操作）
-    if menu == "成绩管理":
-        st.subheader("📖 成绩管理")
-        if st.session_state["role"] != "admin":
-            st.error("❌ 无权限！仅管理员可管理成绩")
-            return
-        
-        # 子菜单：新增/修改/删除成绩
-        sub_menu = st.radio("请选择操作", ["新增成绩", "修改成绩", "删除成绩"])
-        
-        # 6.1 新增成绩
-        if sub_menu == "新增成绩":
-            with st.form("add_score_form"):
-                col1, col2, col3 = st.columns(3)
-                stu_id = col1.text_input("学生学号")
-                course_id = col2.text_input("课程ID")
-                score = col3.number_input("成绩", min_value=0.0, max_value=100.0, step=0.5)
-                add_score_btn = st.form_submit_button("新增成绩", type="primary")
-                
-                if add_score_btn:
-                    if not (stu_id and course_id):
-                        st.warning("⚠️ 学号和课程ID不能为空！")
-                        return
-                    
-                    db = connect_db()
-                    if db:
-                        cursor = db.cursor()
-                        try:
-                            # 检查学生和课程是否存在
-                            cursor.execute("SELECT * FROM student WHERE student_id = %s", (stu_id,))
-                            if not cursor.fetchone():
-                                st.error("❌ 学生不存在！")
-                                return
-                            cursor.execute("SELECT * FROM course WHERE course_id = %s", (course_id,))
-                            if not cursor.fetchone():
-                                st.error("❌ 课程不存在！")
-                                return
-                            # 检查是否已存在该成绩
-                            cursor.execute("SELECT * FROM score WHERE student_id = %s AND course_id = %s", (stu_id, course_id))
-                            if cursor.fetchone():
-                                st.error("❌ 该学生已存在该课程成绩！")
-                                return
-                            # 新增成绩
-                            cursor.execute(
-                                "INSERT INTO score (student_id, course_id, score) VALUES (%s, %s, %s)",
-                                (stu_id, course_id, score)
-                            )
-                            db.commit()
-                            st.success("✅ 成绩新增成功！")
-                        except Exception as e:
-                            db.rollback()
-                            st.error(f"新增失败：{str(e)}")
-                        finally:
-                            cursor.close()
-                            db.close()
-        
-        # 6.2 修改成绩
-        elif sub_menu == "修改成绩":
-            with st.form("update_score_form"):
-                col1, col2, col3 = st.columns(3)
-                stu_id = col1.text_input("学生学号")
-                course_id = col2.text_input("课程ID")
-                new_score = col3.number_input("新成绩", min_value=0.0, max_value=100.0, step=0.5)
-                update_score_btn = st.form_submit_button("修改成绩", type="primary")
-                
-                if update_score_btn:
-                    if not (stu_id and course_id):
-                        st.warning("⚠️ 学号和课程ID不能为空！")
-                        return
-                    
-                    db = connect_db()
-                    if db:
-                        cursor = db.cursor()
-                        try:
-                            # 检查成绩是否存在
-                            cursor.execute("SELECT * FROM score WHERE student_id = %s AND course_id = %s", (stu_id, course_id))
-                            if not cursor.fetchone():
-                                st.error("❌ 该成绩不存在！")
-                                return
-                            # 修改成绩
-                            cursor.execute(
-                                "UPDATE score SET score = %s WHERE student_id = %s AND course_id = %s",
-                                (new_score, stu_id, course_id)
-                            )
-                            db.commit()
-                            if cursor.rowcount > 0:
-                                st.success("✅ 成绩修改成功！")
-                            else:
-                                st.info("ℹ️ 无数据被修改！")
-                        except Exception as e:
-                            db.rollback()
-                            st.error(f"修改失败：{str(e)}")
-                        finally:
-                            cursor.close()
-                            db.close()
-        
-        # 6.3 删除成绩
-        elif sub_menu == "删除成绩":
-            with st.form("delete_score_form"):
-                col1, col2 = st.columns(2)
-                stu_id = col1.text_input("学生学号")
-                course_id = col2.text_input("课程ID")
-                confirm_delete = st.checkbox("我确认要删除该成绩")
-                delete_score_btn = st.form_submit_button("删除成绩", type="primary")
-                
-                if delete_score_btn:
-                    if not (stu_id and course_id):
-                        st.warning("⚠️ 学号和课程ID不能为空！")
-                        return
-                    if not confirm_delete:
-                        st.warning("⚠️ 请勾选确认删除！")
-                        return
-                    
-                    db = connect_db()
-                    if db:
-                        cursor = db.cursor()
-                        try:
-                            # 检查成绩是否存在
-                            cursor.execute("SELECT * FROM score WHERE student_id = %s AND course_id = %s", (stu_id, course_id))
-                            if not cursor.fetchone():
-                                st.error("❌ 该成绩不存在！")
-                                return
-                            # 删除成绩
-                            cursor.execute("DELETE FROM score WHERE student_id = %s AND course_id = %s", (stu_id, course_id))
-                            db.commit()
-                            if cursor.rowcount > 0:
-                                st.success("✅ 成绩删除成功！")
-                            else:
-                                st.info("ℹ️ 无成绩数据被删除！")
-                        except Exception as e:
-                            db.rollback()
-                            st.error(f"删除失败：{str(e)}")
-                        finally:
-                            cursor.close()
-                            db.close()
-    
-    # 7. 绩点排名（所有人可看）
-    if menu == "绩点排名":
-        st.subheader("🏆 学生绩点排名（降序）")
-        query_rank_btn = st.button("刷新排名", type="primary")
-        
-        if query_rank_btn:
-            db = connect_db()
-            if db:
-                cursor = db.cursor()
-                try:
-                    # 查所有学生
-                    cursor.execute("SELECT student_id, name, class FROM student")
-                    all_students = cursor.fetchall()
-                    if not all_students:
-                        st.info("ℹ️ 暂无学生数据！")
-                        return
-                    
-                    # 计算每个学生的平均绩点
-                    rank_data = []
-                    export_rank_data = []
-                    for stu in all_students:
-                        stu_id, stu_name, stu_class = stu
-                        # 查该学生成绩
-                        cursor.execute("SELECT score FROM score WHERE student_id = %s", (stu_id,))
-                        scores = cursor.fetchall()
-                        
-                        total_gpa = 0.0
-                        course_count = 0
-                        for score in scores:
-                            if score[0] is not None:
-                                total_gpa += calculate_gpa(score[0])
-                                course_count += 1
-                        avg_gpa = round(total_gpa / course_count, 2) if course_count > 0 else 0.0
-                        rank_data.append({
-                            "排名": "",  # 占位，后续填充
-                            "学号": stu_id,
-                            "姓名": stu_name,
-                            "班级": stu_class,
-                            "平均绩点": avg_gpa
-                        })
-                    
-                    # 按平均绩点降序排序
-                    rank_data.sort(key=lambda x: x["平均绩点"], reverse=True)
-                    # 填充排名
-                    for i in range(len(rank_data)):
-                        rank_data[i]["排名"] = i + 1
-                        export_rank_data.append({
-                            "排名": i + 1,
-                            "学号": rank_data[i]["学号"],
-                            "姓名": rank_data[i]["姓名"],
-                            "班级": rank_data[i]["班级"],
-                            "平均绩点": rank_data[i]["平均绩点"]
-                        })
-                    
-                    # 展示排名表格
-                    st.dataframe(rank_data, use_container_width=True)
-                    
-                    # 导出排名数据
-                    st.divider()
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        # 导出Excel
-                        excel_data = export_to_excel(export_rank_data, "学生绩点排名")
-                        st.download_button(
-                            label="📥 导出排名为Excel",
-                            data=excel_data,
-                            file_name="学生绩点排名.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
-                    with col2:
-                        # 导出CSV
-                        csv_data = export_to_csv(export_rank_data, "学生绩点排名")
-                        st.download_button(
-                            label="📥 导出排名为CSV",
-                            data=csv_data,
-                            file_name="学生绩点排名.csv",
-                            mime="text/csv"
-                        )
-                        
-                except Exception as e:
-                    st.error(f"排名查询失败：{str(e)}")
-                finally:
-                    cursor.close()
-                    db.close()
-    
-    # 8. 班级+学科成绩统计
-    if menu == "班级+学科成绩统计":
-        st.subheader("📊 班级+学科成绩统计与可视化")
-        
-        with st.form("class_course_analysis_form"):
-            col1, col2 = st.columns(2)
-            class_name = col1.text_input("班级名称", placeholder="例如：计科2401")
-            course_id = col2.text_input("课程ID", placeholder="例如：C001")
-            analyze_btn = st.form_submit_button("统计并生成图表", type="primary")
-            
-            if analyze_btn:
-                if not (class_name and course_id):
-                    st.warning("⚠️ 班级名称和课程ID不能为空！")
-                    return
-                
-                db = connect_db()
-                if db:
-                    cursor = db.cursor()
-                    try:
-                        # 查询课程名称
-                        cursor.execute("SELECT course_name FROM course WHERE course_id = %s", (course_id,))
-                        course_name = cursor.fetchone()
-                        if not course_name:
-                            st.error("❌ 课程ID不存在！")
-                            return
-                        course_name = course_name[0]
-                        
-                        # 查询该班级选了这门课的学生成绩
-                        cursor.execute("""
-                            SELECT sc.score 
-                            FROM student s
-                            JOIN score sc ON s.student_id = sc.student_id
-                            WHERE s.class = %s AND sc.course_id = %s
-                        """, (class_name, course_id))
-                        scores = cursor.fetchall()
-                        scores = [score[0] for score in scores if score[0] is not None]
-                        
-                        if not scores:
-                            st.info(f"ℹ️ {class_name}班暂无{course_name}（{course_id}）的成绩数据！")
-                            return
-                        
-                        # 生成图表和统计信息
-                        img, stats = generate_score_chart(class_name, course_id, course_name, scores)
-                        
-                        # 展示统计信息
-                        st.subheader("📈 统计结果")
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.metric("参与统计人数", stats["student_count"])
-                            st.metric("学科平均分", stats["avg_score"])
-                        with col2:
-                            st.write("### 成绩等级分布")
-                            for level, count in stats["grade_distribution"].items():
-                                percentage = stats["grade_percentages"][level]
-                                st.write(f"- {level}：{count}人 ({percentage}%)")
-                        
-                        # 展示图表
-                        st.subheader("📊 成绩可视化图表")
-                        st.image(img, use_column_width=True)
-                        
-                        # 导出图表
-                        img_buffer = BytesIO()
-                        img.save(img_buffer, format='PNG')
-                        img_buffer.seek(0)
-                        st.download_button(
-                            label="📥 下载成绩图表",
-                            data=img_buffer,
-                            file_name=f"{class_name}班{course_name}成绩统计.png",
-                            mime="image/png"
-                        )
-                        
-                        # 导出统计数据
-                        stats_data = [
-                            {"指标": "班级", "值": stats["class_name"]},
-                            {"指标": "课程ID", "值": stats["course_id"]},
-                            {"指标": "课程名称", "值": stats["course_name"]},
-                            {"指标": "参与统计人数", "值": stats["student_count"]},
-                            {"指标": "学科平均分", "值": stats["avg_score"]},
-                            {"指标": "不及格人数", "值": f"{stats['grade_distribution']['不及格']}人 ({stats['grade_percentages']['不及格']}%)"},
-                            {"指标": "及格人数", "值": f"{stats['grade_distribution']['及格']}人 ({stats['grade_percentages']['及格']}%)"},
-                            {"指标": "良好人数", "值": f"{stats['grade_distribution']['良好']}人 ({stats['grade_percentages']['良好']}%)"},
-                            {"指标": "优秀人数", "值": f"{stats['grade_distribution']['优秀']}人 ({stats['grade_percentages']['优秀']}%)"},
-                        ]
-                        excel_data = export_to_excel(stats_data, f"{class_name}班{course_name}成绩统计")
-                        st.download_button(
-                            label="📥 下载统计数据Excel",
-                            data=excel_data,
-                            file_name=f"{class_name}班{course_name}成绩统计.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
-                        
-                    except Exception as e:
-                        st.error(f"统计失败：{str(e)}")
-                    finally:
-                        cursor.close()
-                        db.close()
-
-# ---------------------- 程序入口 ----------------------
-if __name__ == "__main__":
-    # 初始化session状态
-    if "is_login" not in st.session_state:
-        st.session_state["is_login"] = False
-    
-    # 安装依赖提示（首次运行）
-    if st.session_state.get("show_install_hint", True):
-        with st.expander("📝 首次运行请先安装依赖", expanded=False):
-            st.code("pip install pandas openpyxl matplotlib pillow", language="bash")
-        st.session_state["show_install_hint"] = False
-    
-    # 未登录显示登录页，已登录显示主界面
-    if not st.session_state["is_login"]:
-        login_page()
-    else:
-        main_page()
\ No newline at end of file
+import asyncio
+import base64
+import cProfile
+import json
+import marshal
+import os
+import pstats
+import random
+import sqlite3
+import sys
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import pymysql
+import pandas as pd
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from io import BytesIO, StringIO
+
+# ---------------------- 全局配置 ----------------------
+st.set_page_config(page_title="学生成绩管理系统", layout="wide")
+
+# 设置matplotlib中文显示
+plt.rcParams["font.family"] = ["SimHei", "WenQuanYi Micro Hei", "Heiti TC"]
+plt.rcParams['axes.unicode_minus'] = False
+
+# ---------------------- 数据库连接函数 ----------------------
+# 数据库后端：mysql（云数据库，默认）或 sqlite（单机/离线部署，嵌入式WAL模式）
+DB_BACKEND = os.environ.get("DB_BACKEND", "mysql")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "grade_management.db")
+# 空库首次启动时创建的管理员（admin）密码，未设置时不创建任何账号
+SQLITE_ADMIN_PASSWORD = os.environ.get("SQLITE_ADMIN_PASSWORD", "")
+
+# SQLite表结构，与云数据库的表和字段保持一致
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL,
+    role TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS student (
+    student_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    gender TEXT,
+    class TEXT
+);
+CREATE TABLE IF NOT EXISTS course (
+    course_id TEXT PRIMARY KEY,
+    course_name TEXT NOT NULL,
+    credit INTEGER
+);
+CREATE TABLE IF NOT EXISTS score (
+    student_id TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    score REAL,
+    PRIMARY KEY (student_id, course_id)
+);
+CREATE INDEX IF NOT EXISTS idx_student_class ON student(class);
+CREATE INDEX IF NOT EXISTS idx_score_course ON score(course_id);
+CREATE TABLE IF NOT EXISTS data_marker (
+    id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO data_marker (id, version) VALUES (1, 0);
+"""
+
+class SQLiteCursor:
+    """sqlite3游标包装：把pymysql的 %s 占位符转换为sqlite3的 ? 占位符"""
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(sql.replace("%s", "?"), params)
+        return self._cursor.rowcount
+
+    def executemany(self, sql, seq_of_params):
+        self._cursor.executemany(sql.replace("%s", "?"), seq_of_params)
+        return self._cursor.rowcount
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class SQLiteConnection:
+    """sqlite3连接包装，提供与pymysql连接相同的 cursor/commit/rollback/close 接口"""
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, cursor_class=None):
+        # sqlite3游标本身按需逐行读取，无需单独的流式游标类型
+        return SQLiteCursor(self._conn.cursor())
+
+    def ping(self, reconnect=False):
+        # 本地数据库文件不存在断线问题
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+# Streamlit每次重跑都会重新执行本脚本，模块级的“已初始化”标志会被重置，因此放在cache_resource中；
+# cache_resource对同一参数的并发调用只执行一次，其余会话等待其完成
+@st.cache_resource(show_spinner=False)
+def _init_sqlite(path):
+    """建表，空库时创建管理员账号；每个进程对每个数据库文件只执行一次"""
+    conn = sqlite3.connect(path, timeout=10)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SQLITE_SCHEMA)
+        # 空库时用部署者设置的密码创建管理员账号，不使用公开的默认密码
+        if SQLITE_ADMIN_PASSWORD and conn.execute("SELECT COUNT(*) FROM user").fetchone()[0] == 0:
+            conn.execute(
+                "INSERT INTO user (username, password, role) VALUES (?, ?, ?)",
+                ("admin", SQLITE_ADMIN_PASSWORD, "admin")
+            )
+        conn.commit()
+    finally:
+        conn.close()
+    return True
+
+def _connect_sqlite():
+    """打开SQLite数据库（WAL模式），本进程首次连接时建表"""
+    _init_sqlite(SQLITE_PATH)
+    conn = sqlite3.connect(SQLITE_PATH, timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return SQLiteConnection(conn)
+
+def sqlite_missing_admin():
+    """SQLite库中还没有任何账号（未设置 SQLITE_ADMIN_PASSWORD 时不会自动创建管理员）"""
+    if DB_BACKEND != "sqlite" or SQLITE_ADMIN_PASSWORD:
+        return False
+    conn = _connect_sqlite()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM user").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+# 主库配置（所有写入及读己之写的查询）
+DB_PRIMARY = {
+    "host": os.environ.get("DB_HOST", "dbconn.sealoshzh.site"),
+    "port": int(os.environ.get("DB_PORT", 40210)),
+    "user": os.environ.get("DB_USER", "root"),
+    "password": os.environ.get("DB_PASSWORD", "d7f6x5pf"),
+    "db": os.environ.get("DB_NAME", "grade_management"),
+}
+
+# 副本连接超时秒数：副本不可用时尽快回退主库（pymysql默认10秒）
+REPLICA_CONNECT_TIMEOUT = float(os.environ.get("DB_REPLICA_CONNECT_TIMEOUT", 2))
+# 连接失败的副本暂停使用的秒数，期间读请求不再尝试该副本
+REPLICA_COOLDOWN_SECONDS = float(os.environ.get("DB_REPLICA_COOLDOWN_SECONDS", 30))
+
+def _parse_replicas(spec):
+    """解析只读副本配置，格式："host1:port1,host2:port2"，账号密码与主库相同"""
+    replicas = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        replicas.append({
+            **DB_PRIMARY, "host": host, "port": int(port) if port else DB_PRIMARY["port"],
+            "connect_timeout": REPLICA_CONNECT_TIMEOUT
+        })
+    return replicas
+
+# 只读副本配置（排名、统计、导出等分析查询）
+DB_REPLICAS = _parse_replicas(os.environ.get("DB_REPLICAS", ""))
+# 会话写入后，读请求继续走主库的秒数（避免副本延迟导致读不到刚写入的数据）
+STICKY_PRIMARY_SECONDS = float(os.environ.get("DB_STICKY_SECONDS", 5))
+
+def _connect(endpoint):
+    """按配置建立连接，失败时抛出异常"""
+    if DB_BACKEND == "sqlite":
+        return _connect_sqlite()
+    return pymysql.connect(charset="utf8mb4", **endpoint)
+
+def _recently_wrote():
+    """当前会话是否在粘滞时间窗内写入过数据"""
+    if get_script_run_ctx() is None:
+        # 后台线程没有会话
+        return False
+    last_write_at = st.session_state.get("last_write_at")
+    return last_write_at is not None and time.time() - last_write_at < STICKY_PRIMARY_SECONDS
+
+class EndpointHealth:
+    """记录连接失败的端点，冷却期内跳过，冷却期过后重新尝试"""
+    def __init__(self, cooldown_seconds):
+        self._cooldown_seconds = cooldown_seconds
+        self._down_until = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(endpoint):
+        return endpoint["host"], endpoint["port"]
+
+    def available(self, endpoints):
+        now = time.monotonic()
+        with self._lock:
+            return [e for e in endpoints if self._down_until.get(self._key(e), 0) <= now]
+
+    def mark_down(self, endpoint):
+        with self._lock:
+            self._down_until[self._key(endpoint)] = time.monotonic() + self._cooldown_seconds
+
+    def status(self, endpoints):
+        """各端点状态及剩余冷却秒数"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {"副本": f"{e['host']}:{e['port']}", "剩余冷却(秒)": round(max(self._down_until.get(self._key(e), 0) - now, 0), 1)}
+                for e in endpoints
+            ]
+
+@st.cache_resource
+def _replica_health():
+    return EndpointHealth(REPLICA_COOLDOWN_SECONDS)
+
+replica_health = _replica_health()
+
+def _connect_replica():
+    """随机连接一个未在冷却期的只读副本，连接失败的副本进入冷却期；没有可用副本时抛出异常"""
+    replicas = replica_health.available(DB_REPLICAS)
+    random.shuffle(replicas)
+    error = RuntimeError("没有可用的只读副本")
+    for replica in replicas:
+        try:
+            return _connect(replica)
+        except Exception as e:
+            replica_health.mark_down(replica)
+            error = e
+    raise error
+
+# 数据版本标记：每次写入在同一事务中推进，随复制到达副本，副本上的值表示它已追上的数据版本
+MYSQL_DATA_MARKER_DDL = (
+    "CREATE TABLE IF NOT EXISTS data_marker (id INT PRIMARY KEY, version BIGINT NOT NULL)",
+    "INSERT IGNORE INTO data_marker (id, version) VALUES (1, 0)",
+)
+
+@st.cache_resource
+def _mysql_data_marker():
+    """在云数据库中创建数据版本标记表，每个进程执行一次（DDL会隐式提交，不能放进写入事务）"""
+    conn = _connect(DB_PRIMARY)
+    try:
+        cursor = conn.cursor()
+        for sql in MYSQL_DATA_MARKER_DDL:
+            cursor.execute(sql)
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+
+def bump_data_marker(db):
+    """在写入事务中（提交前）推进数据版本标记，返回本次写入的版本号，提交后传给 mark_write
+
+    新版本号同时大于标记和缓存中的当前版本号，保证写入后缓存键一定变化。
+    使用单独的游标，不影响调用方游标的 rowcount。
+    """
+    current = data_version()
+    cursor = db.cursor()
+    try:
+        cursor.execute(
+            "UPDATE data_marker SET version = CASE WHEN version >= %s THEN version + 1 ELSE %s END WHERE id = 1",
+            (current, current + 1)
+        )
+        cursor.execute("SELECT version FROM data_marker WHERE id = 1")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+def replica_version(conn):
+    """副本已复制到的数据版本，读取失败时返回-1（视为落后）
+
+    MySQL默认为可重复读隔离级别，同一连接随后的查询读到的数据不会比该标记旧。
+    """
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT version FROM data_marker WHERE id = 1")
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        return row[0] if row else -1
+    except Exception:
+        return -1
+
+def connect_db(readonly=False, min_version=None):
+    """连接数据库，返回连接对象
+
+    readonly=True 的查询优先路由到只读副本；会话刚写入过数据或副本全部不可用时回退到主库。
+    结果按数据版本号缓存的分析查询传入 min_version（缓存键中的版本号）：副本的数据版本标记
+    落后于它时回退到主库，避免把副本上的旧数据当作该版本的结果缓存下来。
+    SQLite后端为单机部署，没有副本，所有查询使用同一个本地数据库文件。
+    """
+    if readonly and DB_BACKEND == "mysql" and DB_REPLICAS and not _recently_wrote():
+        try:
+            conn = _connect_replica()
+        except Exception:
+            conn = None
+        if conn is not None:
+            if min_version is None or replica_version(conn) >= min_version:
+                return conn
+            conn.close()
+    try:
+        if DB_BACKEND == "mysql":
+            _mysql_data_marker()
+        # Sealos云数据库配置
+        return _connect(DB_PRIMARY)
+    except Exception as e:
+        st.error(f"数据库连接失败：{str(e)}")
+        st.warning("请检查：1. 云数据库是否正常运行 2. 账号密码/端口是否正确")
+        return None
+
+# ---------------------- 并发查询 ----------------------
+# 并发查询的工作线程数
+FANOUT_WORKERS = int(os.environ.get("FANOUT_WORKERS", 8))
+# 每个连接池保留的空闲连接数
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 8))
+
+class ConnectionPool:
+    """数据库连接池：并发查询复用空闲连接，省去每条查询建立连接的开销
+
+    没有空闲连接时调用 connect 新建，连接失败时抛出异常。
+    """
+    def __init__(self, connect, size):
+        self._connect = connect
+        self._size = size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                break
+            try:
+                # 空闲连接可能已被服务端超时断开
+                conn.ping(reconnect=True)
+                return conn
+            except Exception:
+                self._close(conn)
+        return self._connect()
+
+    def release(self, conn):
+        try:
+            # 结束只读事务，下次使用时能看到最新数据（MySQL默认为可重复读隔离级别）
+            conn.rollback()
+        except Exception:
+            self._close(conn)
+            return
+        with self._lock:
+            if len(self._idle) < self._size:
+                self._idle.append(conn)
+                return
+        self._close(conn)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+@st.cache_resource
+def _connection_pools():
+    pools = {"primary": ConnectionPool(lambda: _connect(DB_PRIMARY), DB_POOL_SIZE), "replica": None}
+    if DB_BACKEND == "mysql" and DB_REPLICAS:
+        # 副本连接与 connect_db 共用健康状态，冷却中的副本不会被尝试
+        pools["replica"] = ConnectionPool(_connect_replica, DB_POOL_SIZE)
+    return pools
+
+@st.cache_resource
+def _fanout_executor():
+    return ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="query-fanout")
+
+def _pooled_query(pools, sql, params=(), consume=None):
+    """在工作线程中执行一条查询：按顺序尝试连接池，用完归还连接
+
+    pools 为 [(连接池, 最低数据版本)]，最低数据版本不为None时跳过标记落后于它的副本连接。
+    """
+    error = RuntimeError("数据库连接失败")
+    for pool, min_version in pools:
+        try:
+            conn = pool.acquire()
+        except Exception as e:
+            error = e
+            continue
+        if min_version is None or replica_version(conn) >= min_version:
+            break
+        pool.release(conn)
+    else:
+        raise error
+    try:
+        if consume is None:
+            cursor = conn.cursor()
+        else:
+            cursor = conn.cursor(pymysql.cursors.SSCursor)
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall() if consume is None else consume(cursor)
+        finally:
+            cursor.close()
+    finally:
+        pool.release(conn)
+
+async def fetch_all_async(queries, pools):
+    """在线程池中并发执行查询，按顺序返回结果"""
+    loop = asyncio.get_running_loop()
+    executor = _fanout_executor()
+    return await asyncio.gather(*(
+        loop.run_in_executor(executor, _pooled_query, pools, *query) for query in queries
+    ))
+
+def fetch_concurrently(queries, readonly=True, min_version=None):
+    """并发执行互不依赖的查询，按顺序返回各自的结果，页面耗时接近最慢的一条查询而不是全部之和
+
+    每条查询为 (sql, params) 或 (sql, params, consume)：默认返回 fetchall() 的结果；
+    给出 consume 时改用流式游标，返回 consume(cursor)。任一查询失败时抛出异常。
+    readonly/min_version 的含义与 connect_db 相同，每条查询各自检查所用副本连接的数据版本。
+    """
+    pools = _connection_pools()
+    # 读写路由在调用线程中决定：工作线程没有会话，看不到会话的写入时间
+    chain = [(pools["primary"], None)]
+    if readonly and pools["replica"] is not None and not _recently_wrote():
+        chain.insert(0, (pools["replica"], min_version))
+    return asyncio.run(fetch_all_async(queries, chain))
+
+# ---------------------- 共享缓存 ----------------------
+# 缓存后端：memory（进程内）、sqlite（本机多个Streamlit进程共享的磁盘缓存）、redis（多机共享）
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+CACHE_PATH = os.environ.get("CACHE_PATH", "report_cache.db")
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+# 缓存容量上限（MB），超出后淘汰最久未访问的条目
+CACHE_MAX_MB = float(os.environ.get("CACHE_MAX_MB", 256))
+# 报表缓存的过期秒数
+REPORT_CACHE_TTL = int(os.environ.get("REPORT_CACHE_TTL", 3600))
+# 缓存后端访问超时（秒）及出错后的冷却时间：冷却期内不再访问后端，直接按未命中处理
+CACHE_TIMEOUT_SECONDS = float(os.environ.get("CACHE_TIMEOUT_SECONDS", 2))
+CACHE_COOLDOWN_SECONDS = float(os.environ.get("CACHE_COOLDOWN_SECONDS", 10))
+
+def _cache_key(key):
+    """元组键转为字符串"""
+    return repr(key) if isinstance(key, tuple) else str(key)
+
+def _json_default(value):
+    """JSON不支持的类型：字节串（图表PNG）转为base64，NumPy标量转为Python数值"""
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"缓存值不支持的类型：{type(value).__name__}")
+
+def _json_object_hook(obj):
+    if len(obj) == 1 and "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    return obj
+
+def dump_cache_value(value):
+    """缓存值序列化为JSON：共享缓存（尤其是Redis）中的数据可能被他人写入，不能用pickle反序列化"""
+    return json.dumps(value, ensure_ascii=False, default=_json_default).encode("utf-8")
+
+def load_cache_value(data):
+    """反序列化缓存值，无法解析的数据（如旧版本写入的pickle）视为未命中，返回None"""
+    try:
+        return json.loads(data.decode("utf-8"), object_hook=_json_object_hook)
+    except ValueError:
+        return None
+
+class MemoryCacheBackend:
+    """进程内缓存：按容量LRU淘汰，支持TTL；数据版本号只在本进程内有效"""
+    def __init__(self, max_bytes):
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._items = OrderedDict()  # 键 -> (序列化值, 过期时间)
+        self._size = 0
+        self._counters = defaultdict(int)
+
+    def get(self, key):
+        key = _cache_key(key)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[1] is not None and item[1] < time.time():
+                self._size -= len(self._items.pop(key)[0])
+                return None
+            self._items.move_to_end(key)
+        return load_cache_value(item[0])
+
+    def set(self, key, value, ttl=None):
+        key, data = _cache_key(key), dump_cache_value(value)
+        if len(data) > self._max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._size -= len(self._items.pop(key)[0])
+            self._items[key] = (data, time.time() + ttl if ttl else None)
+            self._size += len(data)
+            while self._size > self._max_bytes:
+                self._size -= len(self._items.popitem(last=False)[1][0])
+
+    def counter(self, name):
+        with self._lock:
+            return self._counters[name]
+
+    def advance(self, name, value):
+        """把计数器推进到至少value（不会回退）"""
+        with self._lock:
+            self._counters[name] = max(self._counters[name], value)
+
+class SQLiteCacheBackend:
+    """本机磁盘缓存：多个Streamlit进程共用同一个SQLite文件（WAL模式），按容量淘汰最久未访问的条目"""
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        expires_at REAL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed_at);
+    CREATE TABLE IF NOT EXISTS counter (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+    """
+
+    def __init__(self, path, max_bytes):
+        self._path = path
+        self._max_bytes = max_bytes
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(self.SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3连接不能跨线程使用，每个线程一个连接
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=CACHE_TIMEOUT_SECONDS)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn, key, now = self._conn(), _cache_key(key), time.time()
+        row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] is not None and row[1] < now:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            conn.commit()
+            return None
+        conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        conn.commit()
+        return load_cache_value(row[0])
+
+    def set(self, key, value, ttl=None):
+        conn, key, now = self._conn(), _cache_key(key), time.time()
+        data = dump_cache_value(value)
+        if len(data) > self._max_bytes:
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, data, len(data), now + ttl if ttl else None, now)
+        )
+        conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        # 超出容量时按最久未访问淘汰
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        while total > self._max_bytes:
+            victim = conn.execute("SELECT key, size FROM cache ORDER BY accessed_at LIMIT 1").fetchone()
+            conn.execute("DELETE FROM cache WHERE key = ?", (victim[0],))
+            total -= victim[1]
+        conn.commit()
+
+    def counter(self, name):
+        row = self._conn().execute("SELECT value FROM counter WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def advance(self, name, value):
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO counter (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = MAX(value, excluded.value)",
+            (name, value)
+        )
+        conn.commit()
+
+class RedisCacheBackend:
+    """Redis（或兼容协议的服务）缓存：多台机器共享；容量上限由服务端 maxmemory + allkeys-lru 策略保证"""
+    PREFIX = "grade_management:"
+
+    def __init__(self, url):
+        # redis为可选依赖，只有选用该后端时才需要安装
+        import redis
+        self._client = redis.Redis.from_url(
+            url, socket_timeout=CACHE_TIMEOUT_SECONDS, socket_connect_timeout=CACHE_TIMEOUT_SECONDS
+        )
+
+    def get(self, key):
+        data = self._client.get(self.PREFIX + _cache_key(key))
+        return None if data is None else load_cache_value(data)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self.PREFIX + _cache_key(key), dump_cache_value(value), ex=ttl)
+
+    def counter(self, name):
+        value = self._client.get(self.PREFIX + "counter:" + name)
+        return int(value) if value is not None else 0
+
+    def advance(self, name, value):
+        key = self.PREFIX + "counter:" + name
+
+        def update(pipe):
+            # WATCH期间其他进程修改了计数器时，redis-py会自动重试
+            if value > int(pipe.get(key) or 0):
+                pipe.multi()
+                pipe.set(key, value)
+
+        self._client.transaction(update, key)
+
+class FailSoftCache:
+    """包装缓存后端，后端出错（Redis不可达、缓存文件被锁等）时不向调用方抛出异常：
+    读取按未命中处理，写入直接放弃，出错后冷却一段时间不再访问后端。
+    数据版本号同时记在本进程内，后端不可用时用本进程的版本号，本进程的写入仍能使缓存失效"""
+    def __init__(self, create_backend, cooldown_seconds):
+        self._create_backend = create_backend
+        self._cooldown_seconds = cooldown_seconds
+        self._backend = None
+        self._down_until = 0
+        self._lock = threading.Lock()
+        self._local = MemoryCacheBackend(0)
+
+    def _call(self, method, *args):
+        """调用后端方法，后端不可用或出错时返回 (False, None)"""
+        if time.monotonic() < self._down_until:
+            return False, None
+        try:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._create_backend()
+                backend = self._backend
+            return True, getattr(backend, method)(*args)
+        except Exception:
+            self._down_until = time.monotonic() + self._cooldown_seconds
+            return False, None
+
+    def get(self, key):
+        return self._call("get", key)[1]
+
+    def set(self, key, value, ttl=None):
+        self._call("set", key, value, ttl)
+
+    def counter(self, name):
+        local = self._local.counter(name)
+        ok, value = self._call("counter", name)
+        if not ok:
+            return local
+        if value < local:
+            # 后端不可用期间本进程推进过版本号，恢复后补写到后端，避免版本号回退命中旧缓存
+            self._call("advance", name, local)
+            return local
+        self._local.advance(name, value)
+        return value
+
+    def advance(self, name, value):
+        self._local.advance(name, value)
+        self._call("advance", name, value)
+
+def _create_cache_backend():
+    """按 CACHE_BACKEND 创建缓存后端"""
+    max_bytes = int(CACHE_MAX_MB * 1024 * 1024)
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteCacheBackend(CACHE_PATH, max_bytes)
+    if CACHE_BACKEND == "redis":
+        return RedisCacheBackend(CACHE_REDIS_URL)
+    return MemoryCacheBackend(max_bytes)
+
+# Streamlit每次重跑都会重新执行本脚本，进程级共享对象需放在cache_resource中才能跨重跑保留
+@st.cache_resource
+def get_cache():
+    """缓存后端（出错时按未命中处理，见 FailSoftCache）"""
+    return FailSoftCache(_create_cache_backend, CACHE_COOLDOWN_SECONDS)
+
+def data_version():
+    """返回当前数据版本号（保存在缓存后端中，各进程共享），缓存键带上版本号，写入后旧缓存自然失效"""
+    return get_cache().counter("data_version")
+
+def mark_write(version):
+    """写入提交后、在数据库事务的 try/except 之外调用：记录当前会话的写入时间（之后一段时间内的读请求固定走主库），
+    并把数据版本号推进到本次写入的版本（bump_data_marker 的返回值），使缓存失效"""
+    st.session_state["last_write_at"] = time.time()
+    get_cache().advance("data_version", version)
+
+# ---------------------- 工具函数 ----------------------
+def _gpa_formula(scores):
+    """分数到单门课绩点的换算公式（向量化），缺失成绩（NaN）的绩点仍为NaN"""
+    scores = np.asarray(scores, dtype=float)
+    above = scores - 60
+    gpa = np.where(above < 30, np.minimum(1 + above / 10, 4.0), 4 + (above - 30) / 10)
+    return np.where(scores < 60, 0.0, gpa)
+
+# 绩点查找表：成绩按0.5分步长录入，0~100分共201档，下标为 成绩/步长
+GPA_STEP = 0.5
+GPA_TABLE = _gpa_formula(np.arange(int(100 / GPA_STEP) + 1) * GPA_STEP)
+GPA_TABLE.flags.writeable = False
+
+# 平均绩点计算方式 -> 结果列名
+GPA_MODES = {"简单平均": "平均绩点", "学分加权": "学分加权绩点"}
+
+def calculate_gpa(score):
+    """根据分数计算单门课绩点"""
+    score = float(score)
+    index = score / GPA_STEP
+    if index.is_integer() and 0 <= index < len(GPA_TABLE):
+        return float(GPA_TABLE[int(index)])
+    return float(_gpa_formula(score))
+
+def calculate_gpa_array(scores):
+    """calculate_gpa的向量化版本：步长上的成绩直接查表，其余按公式换算，缺失成绩（NaN）的绩点仍为NaN"""
+    scores = np.asarray(scores, dtype=float)
+    index = scores / GPA_STEP
+    on_table = (index == np.round(index)) & (index >= 0) & (index < len(GPA_TABLE))
+    gpa = GPA_TABLE[np.where(on_table, index, 0).astype(np.intp)]
+    if not on_table.all():
+        gpa = np.where(on_table, gpa, _gpa_formula(scores))
+    return gpa
+
+def average_gpa(student_codes, student_count, scores, credits):
+    """一次计算每个学生的简单平均绩点和学分加权绩点，返回 {计算方式: 各学生平均绩点数组}
+
+    输入为长表：student_codes 为每条成绩所属学生的下标（如 pd.factorize 的结果），
+    scores/credits 为对应的成绩和课程学分。缺失成绩不计入，缺失学分的课程不参与加权，
+    没有可计入成绩的学生平均绩点为0。
+    """
+    student_codes = np.asarray(student_codes)
+    gpa = calculate_gpa_array(scores)
+    credits = np.asarray(credits, dtype=float)
+    taken = ~np.isnan(gpa)
+    weighted = taken & ~np.isnan(credits)
+    
+    def per_student(mask, weights=None):
+        return np.bincount(
+            student_codes[mask], weights=None if weights is None else weights[mask], minlength=student_count
+        )
+    
+    zeros = np.zeros(student_count)
+    count = per_student(taken)
+    credit_total = per_student(weighted, credits)
+    return {
+        "简单平均": np.divide(per_student(taken, gpa), count, out=zeros.copy(), where=count > 0),
+        "学分加权": np.divide(per_student(weighted, gpa * credits), credit_total, out=zeros.copy(), where=credit_total > 0),
+    }
+
+def validate_score(score):
+    """验证成绩是否合法"""
+    try:
+        score = float(score)
+        if 0 <= score <= 100:
+            return score, True
+        else:
+            st.warning("成绩必须在0-100之间！")
+            return None, False
+    except ValueError:
+        st.warning("成绩必须是数字！")
+        return None, False
+
+# ---------------------- 成绩统计累加器 ----------------------
+# 从游标分块读取成绩时每块的行数
+STATS_CHUNK_SIZE = 5000
+
+class ScoreStats:
+    """可合并的单遍成绩统计
+
+    分块累加数量、均值、方差（Welford/Chan并行合并公式）、最值，以及0.5分粒度的直方图，
+    由直方图得到近似分位数（误差不超过0.5分）。各班级/各课程的部分结果可以直接merge，
+    得到年级、全校统计而无需重新扫描成绩。
+    """
+    BIN_WIDTH = 0.5
+    BINS = int(100 / BIN_WIDTH) + 1
+    # 成绩等级：(名称, 下限, 上限)，区间左闭右开，优秀包含100分
+    GRADE_LEVELS = (("不及格", 0, 60), ("及格", 60, 80), ("良好", 80, 90), ("优秀", 90, 101))
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.hist = np.zeros(self.BINS, dtype=np.int64)
+
+    def update(self, values):
+        """累加一块成绩，None会被忽略"""
+        arr = np.array([float(v) for v in values if v is not None], dtype=float)
+        if len(arr) == 0:
+            return self
+        chunk = ScoreStats()
+        chunk.count = len(arr)
+        chunk.mean = float(arr.mean())
+        chunk.m2 = float(((arr - chunk.mean) ** 2).sum())
+        chunk.min = float(arr.min())
+        chunk.max = float(arr.max())
+        bins = np.clip(np.floor(arr / self.BIN_WIDTH).astype(np.int64), 0, self.BINS - 1)
+        chunk.hist = np.bincount(bins, minlength=self.BINS)
+        return self.merge(chunk)
+
+    def merge(self, other):
+        """合并另一个部分结果（原地修改并返回self）"""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+        else:
+            total = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / total
+            self.m2 += other.m2 + delta * delta * self.count * other.count / total
+            self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.hist = self.hist + other.hist
+        return self
+
+    @classmethod
+    def merge_all(cls, parts):
+        result = cls()
+        for part in parts:
+            result.merge(part)
+        return result
+
+    @classmethod
+    def from_cursor(cls, cursor, chunk_size=STATS_CHUNK_SIZE):
+        """从已执行查询的游标分块读取第一列成绩"""
+        result = cls()
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return result
+            result.update(row[0] for row in rows)
+
+    @property
+    def variance(self):
+        """总体方差"""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.variance))
+
+    def quantile(self, q):
+        """近似分位数（按直方图取所在0.5分区间的下限，并限制在最值范围内）"""
+        if self.count == 0:
+            return None
+        rank = max(int(np.ceil(q * self.count)), 1)
+        idx = int(np.searchsorted(np.cumsum(self.hist), rank))
+        return min(max(idx * self.BIN_WIDTH, self.min), self.max)
+
+    def grade_distribution(self):
+        """各成绩等级人数"""
+        return {
+            name: int(self.hist[int(low / self.BIN_WIDTH):int(high / self.BIN_WIDTH)].sum())
+            for name, low, high in self.GRADE_LEVELS
+        }
+
+    # summary() 各字段的中文名称，用于页面展示
+    SUMMARY_LABELS = {
+        "count": "人数", "mean": "平均分", "std": "标准差", "min": "最低分", "max": "最高分",
+        "p25": "P25", "median": "中位数", "p75": "P75",
+    }
+
+    def summary(self):
+        """常用统计指标（保留两位小数）"""
+        if self.count == 0:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 2),
+            "std": round(self.std, 2),
+            "min": round(self.min, 2),
+            "max": round(self.max, 2),
+            "p25": self.quantile(0.25),
+            "median": self.quantile(0.5),
+            "p75": self.quantile(0.75),
+        }
+
+# ---------------------- 内存分析与预算 ----------------------
+# 单次请求的内存预算（MB），超出时降级（降低图表DPI、停用Excel导出）或拒绝
+MEMORY_BUDGET_MB = float(os.environ.get("MEMORY_BUDGET_MB", 200))
+# 是否开启tracemalloc内存分析（有额外开销，默认关闭）
+MEMORY_PROFILING = os.environ.get("MEMORY_PROFILING", "0") == "1"
+# 每个操作保留的最大分配位置条数
+MEMORY_TOP_SITES = 10
+
+if MEMORY_PROFILING and not tracemalloc.is_tracing():
+    tracemalloc.start(10)
+
+@st.cache_resource
+def _memory_state():
+    return threading.Lock(), threading.Lock(), {}
+
+# _memory_lock 保护统计表；_measure_lock 保证同一时间只测量一个页面操作
+# 页面操作 -> {"次数", "最近峰值(MB)", "最大峰值(MB)", "分配位置"}
+_memory_lock, _measure_lock, MEMORY_STATS = _memory_state()
+
+@contextmanager
+def track_memory(action):
+    """记录一次页面操作的内存峰值，action可以是字符串或在结束时求值的函数
+
+    tracemalloc的峰值是进程级的，reset_peak() 会清掉其他会话正在测量的峰值，
+    因此开启内存分析时各会话的页面操作串行执行（仅用于诊断，不要在线上常开）。
+    测量期间后台线程（报表预热、并发查询）的分配同样计入峰值。
+    """
+    if not tracemalloc.is_tracing():
+        yield
+        return
+    with _measure_lock:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            peak_mb = max(tracemalloc.get_traced_memory()[1] - baseline, 0) / 1024 / 1024
+            name = action() if callable(action) else action
+            with _memory_lock:
+                stat = MEMORY_STATS.setdefault(name, {"次数": 0, "最近峰值(MB)": 0.0, "最大峰值(MB)": 0.0, "分配位置": []})
+                stat["次数"] += 1
+                stat["最近峰值(MB)"] = round(peak_mb, 2)
+                is_new_max = peak_mb > stat["最大峰值(MB)"]
+                if is_new_max:
+                    stat["最大峰值(MB)"] = round(peak_mb, 2)
+            if is_new_max:
+                # 只在出现新的最大峰值时抓取快照，避免每次请求都付出快照开销
+                top = tracemalloc.take_snapshot().statistics("lineno")[:MEMORY_TOP_SITES]
+                with _memory_lock:
+                    stat["分配位置"] = [
+                        {"位置": str(s.traceback), "大小(KB)": round(s.size / 1024, 1), "块数": s.count}
+                        for s in top
+                    ]
+
+def memory_budget_bytes():
+    return int(MEMORY_BUDGET_MB * 1024 * 1024)
+
+# 图表画布尺寸（英寸）与可选DPI（从高到低）
+CHART_SIZE_INCHES = (12, 6)
+CHART_DPI_LEVELS = (300, 200, 150, 100)
+
+def chart_dpi_for_budget():
+    """按内存预算选择图表DPI，预算不足以渲染最低DPI时返回None
+
+    agg渲染画布为RGBA（每像素4字节），PNG编码缓冲区按同等大小估算。
+    """
+    width, height = CHART_SIZE_INCHES
+    for dpi in CHART_DPI_LEVELS:
+        if width * dpi * height * dpi * 4 * 2 <= memory_budget_bytes():
+            return dpi
+    return None
+
+# 导出时每个单元格的估算内存（字节）：DataFrame + openpyxl单元格对象及XML缓冲
+EXCEL_BYTES_PER_CELL = 800
+# CSV/Parquet/Arrow只需DataFrame和编码缓冲
+COLUMNAR_BYTES_PER_CELL = 200
+
+def excel_export_allowed(rows, cols):
+    """估算Excel导出内存是否在预算内"""
+    return rows * cols * EXCEL_BYTES_PER_CELL <= memory_budget_bytes()
+
+def columnar_export_allowed(rows, cols):
+    """估算CSV/Parquet/Arrow导出内存是否在预算内"""
+    return rows * cols * COLUMNAR_BYTES_PER_CELL <= memory_budget_bytes()
+
+# ---------------------- 性能分析 ----------------------
+# 性能分析方式：确定性分析记录每次函数调用，可导出pstats；采样分析定时抓取调用栈，可导出speedscope火焰图
+PROFILE_CPROFILE = "确定性（cProfile）"
+PROFILE_SAMPLER = "采样（火焰图）"
+# Python 3.12起cProfile基于sys.monitoring，记录进程内所有线程（包括其他会话和后台预热）的调用，
+# 此时默认使用只抓取本次脚本线程的采样分析
+CPROFILE_ALL_THREADS = sys.version_info >= (3, 12)
+PROFILE_MODES = (PROFILE_SAMPLER, PROFILE_CPROFILE) if CPROFILE_ALL_THREADS else (PROFILE_CPROFILE, PROFILE_SAMPLER)
+# 采样间隔（秒）
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", 0.002))
+# 侧边栏展示的热点函数条数
+PROFILE_TOP_FUNCTIONS = 15
+
+def _function_label(filename, line, name):
+    return f"{name}（{os.path.basename(filename)}:{line}）"
+
+class StackSampler:
+    """后台线程定时抓取目标线程的调用栈，结果可导出为speedscope的sampled格式"""
+    def __init__(self, thread_id, interval):
+        self._thread_id = thread_id
+        self._interval = interval
+        # (函数名, 文件, 行号) -> 帧编号
+        self._frames = {}
+        # 每个样本为从根到叶的帧编号列表，权重为距上一次采样的秒数
+        self._samples = []
+        self._weights = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                key = (code.co_name, code.co_filename, code.co_firstlineno)
+                stack.append(self._frames.setdefault(key, len(self._frames)))
+                frame = frame.f_back
+            stack.reverse()
+            self._samples.append(stack)
+            self._weights.append(now - last)
+            last = now
+
+    def top_functions(self, limit=PROFILE_TOP_FUNCTIONS):
+        """按自身耗时排序的热点函数"""
+        self_time = defaultdict(float)
+        total_time = defaultdict(float)
+        for stack, weight in zip(self._samples, self._weights):
+            self_time[stack[-1]] += weight
+            # 递归调用在同一样本中只计一次累计耗时
+            for index in set(stack):
+                total_time[index] += weight
+        frames = list(self._frames)
+        rows = []
+        for index in sorted(self_time, key=self_time.get, reverse=True)[:limit]:
+            name, filename, line = frames[index]
+            rows.append({
+                "函数": _function_label(filename, line, name),
+                "自身耗时(ms)": round(self_time[index] * 1000, 1),
+                "累计耗时(ms)": round(total_time[index] * 1000, 1),
+            })
+        return rows
+
+    def speedscope(self, name):
+        """导出speedscope文件（JSON字节串），可在 https://www.speedscope.app 打开"""
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "学生成绩管理系统",
+            "shared": {"frames": [
+                {"name": func, "file": filename, "line": line}
+                for func, filename, line in self._frames
+            ]},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(self._weights),
+                "samples": self._samples,
+                "weights": self._weights,
+            }],
+        }
+        return json.dumps(document, ensure_ascii=False).encode("utf-8")
+
+def _cprofile_top_functions(stats, limit=PROFILE_TOP_FUNCTIONS):
+    """按自身耗时排序的热点函数，stats为 pstats.Stats.stats"""
+    rows = []
+    for (filename, line, name), (_, calls, self_time, total_time, _) in sorted(
+            stats.items(), key=lambda x: x[1][2], reverse=True)[:limit]:
+        rows.append({
+            "函数": _function_label(filename, line, name),
+            "调用次数": calls,
+            "自身耗时(ms)": round(self_time * 1000, 1),
+            "累计耗时(ms)": round(total_time * 1000, 1),
+        })
+    return rows
+
+@contextmanager
+def profile_rerun(mode, action):
+    """分析一次页面重跑的CPU耗时，结果保存到 st.session_state["profile_report"]
+
+    mode为None时不做任何分析（关闭时没有额外开销）；action为在结束时求值的操作名称函数。
+    采样分析只抓取脚本线程，并发查询工作线程中的耗时表现为脚本线程的等待；确定性分析在
+    Python 3.12以下同样只记录脚本线程，3.12起会记录进程内所有线程（见 CPROFILE_ALL_THREADS）。
+    """
+    if mode is None:
+        yield
+        return
+    profiler = sampler = None
+    if mode == PROFILE_CPROFILE:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # 其他会话正在进行确定性分析（Python 3.12起同一时间只允许一个），改用采样分析
+            profiler, mode = None, PROFILE_SAMPLER
+    if profiler is None:
+        sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL)
+        sampler.start()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        name = action()
+        report = {"操作": name, "方式": mode, "耗时(秒)": round(seconds, 3), "时间": time.strftime("%Y%m%d_%H%M%S")}
+        if profiler is not None:
+            profiler.disable()
+            stats = pstats.Stats(profiler).stats
+            report["热点函数"] = _cprofile_top_functions(stats)
+            # 与 pstats.Stats.dump_stats 的文件格式相同，可用 python -m pstats 或 snakeviz 打开
+            report["文件"] = marshal.dumps(stats)
+            report["扩展名"] = "prof"
+            if CPROFILE_ALL_THREADS:
+                report["说明"] = "当前Python版本的cProfile会记录所有线程，结果包含同时段其他会话和后台任务的调用"
+        else:
+            sampler.stop()
+            report["热点函数"] = sampler.top_functions()
+            report["文件"] = sampler.speedscope(f"{name} {report['时间']}")
+            report["扩展名"] = "speedscope.json"
+        st.session_state["profile_report"] = report
+
+# ---------------------- 导出功能函数 ----------------------
+def export_to_excel(data, filename="学生信息"):
+    """导出数据到Excel"""
+    output = BytesIO()
+    df = pd.DataFrame(data)
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='学生信息')
+    output.seek(0)
+    return output
+
+def export_to_csv(data, filename="学生信息"):
+    """导出数据到CSV（备用方案）"""
+    output = StringIO()
+    df = pd.DataFrame(data)
+    df.to_csv(output, index=False, encoding='utf-8-sig')
+    output.seek(0)
+    return output
+
+# 允许整表导出的数据表（user表含密码，不允许导出）
+# 可导出数据表的列类型（与 SQLITE_SCHEMA/云数据库表结构一致），流式导出不从数据推断类型
+EXPORT_SCHEMAS = {
+    "student": pa.schema([
+        ("student_id", pa.string()), ("name", pa.string()), ("gender", pa.string()), ("class", pa.string())
+    ]),
+    "course": pa.schema([("course_id", pa.string()), ("course_name", pa.string()), ("credit", pa.int64())]),
+    "score": pa.schema([("student_id", pa.string()), ("course_id", pa.string()), ("score", pa.float64())]),
+}
+EXPORT_TABLES = list(EXPORT_SCHEMAS)
+# 流式导出时每个行组的行数
+PARQUET_ROW_GROUP_SIZE = 10000
+
+def _to_arrow_table(data):
+    """把字典列表转换为Arrow表，混合类型的列统一转为字符串"""
+    df = pd.DataFrame(data)
+    for col in df.columns[df.dtypes == object]:
+        if df[col].dropna().map(type).nunique() > 1:
+            df[col] = df[col].map(lambda v: None if v is None else str(v))
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def export_to_parquet(data, filename="学生信息"):
+    """导出数据到Parquet（列式存储，分析任务可直接读取）"""
+    output = BytesIO()
+    pq.write_table(_to_arrow_table(data), output, compression="zstd")
+    output.seek(0)
+    return output
+
+def export_to_arrow(data, filename="学生信息"):
+    """导出数据到Arrow IPC文件"""
+    output = BytesIO()
+    table = _to_arrow_table(data)
+    with pa.ipc.new_file(output, table.schema) as writer:
+        writer.write_table(table)
+    output.seek(0)
+    return output
+
+def export_table_stream(db, table_name, fmt="parquet", row_group_size=PARQUET_ROW_GROUP_SIZE):
+    """从流式游标分批读取整表，按固定表结构逐个行组写入Parquet/Arrow文件"""
+    if table_name not in EXPORT_SCHEMAS:
+        raise ValueError(f"不支持导出的数据表：{table_name}")
+    schema = EXPORT_SCHEMAS[table_name]
+    # MySQL的DECIMAL列返回Decimal对象，浮点列需先转换
+    float_columns = {f.name for f in schema if pa.types.is_floating(f.type)}
+    output = BytesIO()
+    writer = _open_stream_writer(output, schema, fmt)
+    # 无缓冲游标：结果集不会一次性加载到内存
+    cursor = db.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute(f"SELECT {', '.join(schema.names)} FROM {table_name}")
+        while True:
+            rows = cursor.fetchmany(row_group_size)
+            if not rows:
+                break
+            batch = {}
+            for col, values in zip(schema.names, zip(*rows)):
+                if col in float_columns:
+                    values = [None if v is None else float(v) for v in values]
+                batch[col] = list(values)
+            writer.write_table(pa.Table.from_pydict(batch, schema=schema))
+    finally:
+        writer.close()
+        cursor.close()
+    output.seek(0)
+    return output
+
+def _open_stream_writer(output, schema, fmt):
+    """按导出格式创建行组写入器"""
+    if fmt == "parquet":
+        return pq.ParquetWriter(output, schema, compression="zstd")
+    if fmt == "arrow":
+        return pa.ipc.new_file(output, schema)
+    raise ValueError(f"不支持的导出格式：{fmt}")
+
+def load_snapshot(file):
+    """读取Parquet/Arrow快照为DataFrame，供离线分析"""
+    data = file.read() if hasattr(file, "read") else file
+    if data[:4] == b"PAR1":
+        return pq.read_table(pa.BufferReader(data)).to_pandas()
+    if data[:6] == b"ARROW1":
+        return pa.ipc.open_file(pa.BufferReader(data)).read_all().to_pandas()
+    raise ValueError("无法识别的快照文件，仅支持Parquet或Arrow IPC格式")
+
+def generate_score_chart(class_name, course_id, course_name, scores, dpi=300):
+    """生成成绩统计图表，返回PNG字节和统计信息；scores可以是成绩列表或ScoreStats"""
+    # 统计成绩分布
+    if not isinstance(scores, ScoreStats):
+        scores = ScoreStats().update(scores)
+    grade_levels = scores.grade_distribution()
+    score_count = scores.count
+    summary = scores.summary()
+    
+    # 计算统计指标
+    avg_score = summary.get("mean", 0.0)
+    total = sum(grade_levels.values())
+    grade_percentages = {k: round(v/total*100, 1) for k, v in grade_levels.items()}
+    
+    # 生成图表
+    # 使用独立的Figure对象：不进入pyplot全局注册表，渲染完即可回收，多会话并发时也互不干扰
+    fig = Figure(figsize=CHART_SIZE_INCHES)
+    ax1, ax2 = fig.subplots(1, 2)
+    labels = list(grade_levels.keys())
+    sizes = list(grade_levels.values())
+    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']
+    explode = (0.05, 0, 0, 0)
+    
+    # 饼状图
+    wedges, texts, autotexts = ax1.pie(
+        sizes, 
+        explode=explode,
+        labels=labels,
+        colors=colors,
+        autopct='%1.1f%%',
+        shadow=True,
+        startangle=90
+    )
+    ax1.set_title(f'{class_name}班-{course_name}（{course_id}）成绩等级分布\n(参考人数：{score_count}，平均分：{avg_score})', fontsize=12)
+    
+    # 柱状图
+    ax2.bar(labels, sizes, color=colors)
+    ax2.set_title(f'{class_name}班-{course_name}（{course_id}）各成绩等级人数', fontsize=12)
+    ax2.set_ylabel('学生人数')
+    for i, v in enumerate(sizes):
+        ax2.text(i, v + 0.1, str(v), ha='center', va='bottom')
+    
+    fig.tight_layout()
+    
+    # 保存图表为PNG字节（不再解码为位图，避免多保留一份图像内存）
+    img_buffer = BytesIO()
+    fig.savefig(img_buffer, format='png', dpi=dpi, bbox_inches='tight')
+    img = img_buffer.getvalue()
+    img_buffer.close()
+    
+    # 返回图表和统计信息
+    return img, {
+        "class_name": class_name,
+        "course_name": course_name,
+        "course_id": course_id,
+        "student_count": score_count,
+        "avg_score": avg_score,
+        "grade_distribution": grade_levels,
+        "grade_percentages": grade_percentages,
+        "summary": summary
+    }
+
+# ---------------------- 页面查询模板 ----------------------
+# 页面和基准测试（bench_queries.py）共用的查询
+STUDENT_INFO_SQL = "SELECT * FROM student WHERE student_id = %s"
+STUDENT_SCORES_SQL = """
+    SELECT c.course_name, sc.score, c.credit
+    FROM score sc
+    JOIN course c ON sc.course_id = c.course_id
+    WHERE sc.student_id = %s
+"""
+# 没有成绩的学生也保留（绩点为0）
+RANKING_SQL = """
+    SELECT s.student_id, s.name, s.class, sc.score, c.credit
+    FROM student s
+    LEFT JOIN score sc ON s.student_id = sc.student_id
+    LEFT JOIN course c ON sc.course_id = c.course_id
+"""
+COURSE_NAME_SQL = "SELECT course_name FROM course WHERE course_id = %s"
+CLASS_COURSE_SCORES_SQL = """
+    SELECT sc.score
+    FROM student s
+    JOIN score sc ON s.student_id = sc.student_id
+    WHERE s.class = %s AND sc.course_id = %s
+"""
+
+# ---------------------- 成绩总表 ----------------------
+def _split_ids(text):
+    """把逗号分隔的输入拆分为去重后的列表"""
+    return sorted({item.strip() for item in text.replace("，", ",").split(",") if item.strip()})
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_score_matrix(class_name, course_ids, version):
+    """一次关联查询取出成绩，透视为 学生×课程 的成绩矩阵
+
+    version 为数据版本号，参与缓存键；返回 (成绩表DataFrame, 各课程平均分Series)。
+    删除课程不会删除其成绩，这些成绩仍按成绩表中的课程ID成列并计入绩点，与绩点排名一致。
+    """
+    score_join = "LEFT JOIN score sc ON s.student_id = sc.student_id"
+    conditions, params = [], []
+    if course_ids:
+        # 课程条件放在JOIN上，没有这些课程成绩的学生仍保留在总表中
+        score_join += " AND sc.course_id IN (" + ", ".join(["%s"] * len(course_ids)) + ")"
+        params.extend(course_ids)
+    if class_name:
+        conditions.append("s.class = %s")
+        params.append(class_name)
+    sql = f"""
+        SELECT s.student_id, s.name, s.class, sc.course_id, c.course_name, c.credit, sc.score
+        FROM student s
+        {score_join}
+        LEFT JOIN course c ON sc.course_id = c.course_id
+    """
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    
+    db = connect_db(readonly=True, min_version=version)
+    if db is None:
+        raise RuntimeError("数据库连接失败")
+    cursor = db.cursor()
+    try:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        db.close()
+    
+    df = pd.DataFrame(rows, columns=["学号", "姓名", "班级", "课程ID", "课程名称", "学分", "成绩"])
+    if df.empty:
+        return pd.DataFrame(columns=["学号", "姓名", "班级", *GPA_MODES.values()]), pd.Series(dtype=float)
+    df["成绩"] = df["成绩"].astype(float)
+    df["学分"] = df["学分"].astype(float)
+    
+    # 用factorize得到行列下标，直接填充NumPy矩阵完成透视
+    stu_codes, stu_ids = pd.factorize(df["学号"], sort=True)
+    scored = df["课程ID"].notna().to_numpy()
+    course_codes, course_ids_found = pd.factorize(df["课程ID"][scored], sort=True)
+    course_names = df[scored].drop_duplicates("课程ID").set_index("课程ID")["课程名称"]
+    courses = [
+        f"{course_names[cid]}（{cid}）" if pd.notna(course_names[cid]) else f"已删除课程（{cid}）"
+        for cid in course_ids_found
+    ]
+    matrix = np.full((len(stu_ids), len(courses)), np.nan)
+    matrix[stu_codes[scored], course_codes] = df["成绩"].to_numpy()[scored]
+    
+    # 按学生计算两种平均绩点，按列计算平均分（忽略缺失成绩）
+    averages = average_gpa(
+        stu_codes[scored], len(stu_ids), df["成绩"].to_numpy()[scored], df["学分"].to_numpy()[scored]
+    )
+    taken = ~np.isnan(matrix)
+    col_count = taken.sum(axis=0)
+    col_mean = np.divide(np.nansum(matrix, axis=0), col_count, out=np.full(len(courses), np.nan), where=col_count > 0)
+    
+    info = df.drop_duplicates("学号").set_index("学号").loc[stu_ids, ["姓名", "班级"]]
+    sheet = pd.DataFrame(matrix, columns=courses)
+    sheet.insert(0, "学号", stu_ids)
+    sheet.insert(1, "姓名", info["姓名"].to_numpy())
+    sheet.insert(2, "班级", info["班级"].to_numpy())
+    for mode, column in GPA_MODES.items():
+        sheet[column] = np.round(averages[mode], 2)
+    return sheet, pd.Series(np.round(col_mean, 2), index=courses, name="平均分")
+
+# ---------------------- 学生检索索引 ----------------------
+class StudentSearchIndex:
+    """内存中的学生检索索引
+
+    学号、姓名前缀匹配使用有序数组+二分查找；子串匹配使用二元组（n-gram）倒排表求交集后再校验，
+    每次检索最多校验固定数量的候选行，十万级学生规模下延迟依然有界。
+    """
+    NGRAM = 2
+    # 单次检索最多校验的子串候选数
+    MAX_CANDIDATES = 5000
+    # 单次检索在每个有序数组中最多扫描的前缀匹配键数（班级过滤不命中时也不会遍历整个前缀区间）
+    MAX_PREFIX_SCAN = 5000
+
+    def __init__(self, rows):
+        self.ids = [str(r[0]) for r in rows]
+        self.names = [str(r[1] or "") for r in rows]
+        self.classes = [str(r[2] or "") for r in rows]
+        self._id_keys = sorted((sid.lower(), i) for i, sid in enumerate(self.ids))
+        self._name_keys = sorted((name.lower(), i) for i, name in enumerate(self.names))
+        postings = defaultdict(list)
+        by_class = defaultdict(list)
+        for i, (sid, name) in enumerate(zip(self.ids, self.names)):
+            for gram in self._grams(sid.lower()) | self._grams(name.lower()):
+                postings[gram].append(i)
+            by_class[self.classes[i]].append(i)
+        # 倒排表按行号有序，转为NumPy数组便于求交集
+        self._postings = {g: np.array(p, dtype=np.int32) for g, p in postings.items()}
+        self._by_class = {c: np.array(p, dtype=np.int32) for c, p in by_class.items()}
+
+    @classmethod
+    def _grams(cls, text):
+        """文本的所有n-gram；短于n的文本取单字"""
+        if len(text) < cls.NGRAM:
+            return set(text)
+        return {text[i:i + cls.NGRAM] for i in range(len(text) - cls.NGRAM + 1)} | set(text)
+
+    def _prefix(self, keys, text):
+        """有序数组中以text开头的行号（按键有序），最多扫描 MAX_PREFIX_SCAN 个键"""
+        start = bisect_left(keys, (text, -1))
+        # 按下标遍历，不复制数组剩余部分
+        for pos in range(start, min(start + self.MAX_PREFIX_SCAN, len(keys))):
+            key, i = keys[pos]
+            if not key.startswith(text):
+                break
+            yield i
+
+    def _substring_candidates(self, text, within=None):
+        """通过n-gram倒排表求交集，得到可能包含text的行号；within为班级的行号数组时从它开始求交集"""
+        grams = sorted(self._grams(text), key=lambda g: len(self._postings.get(g, ())))
+        result = within
+        if result is not None and len(result) == 0:
+            return result
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                return np.empty(0, dtype=np.int32)
+            result = posting if result is None else np.intersect1d(result, posting, assume_unique=True)
+            if len(result) == 0:
+                break
+        return result
+
+    def search(self, text, class_name=None, limit=20):
+        """按学号/姓名检索：精确学号 > 学号前缀 > 姓名前缀 > 子串匹配，可按班级过滤"""
+        text = text.strip().lower()
+        results, seen = [], set()
+
+        def accept(i):
+            if i in seen or (class_name and self.classes[i] != class_name):
+                return False
+            seen.add(i)
+            results.append(i)
+            return len(results) >= limit
+
+        if not text:
+            # 只按班级筛选
+            for i in self._by_class.get(class_name, ()) if class_name else range(len(self.ids)):
+                if accept(int(i)):
+                    break
+            return self._rows(results)
+
+        for keys in (self._id_keys, self._name_keys):
+            for i in self._prefix(keys, text):
+                if accept(i):
+                    return self._rows(results)
+
+        within = self._by_class.get(class_name, np.empty(0, dtype=np.int32)) if class_name else None
+        candidates = self._substring_candidates(text, within)
+        for i in candidates[:self.MAX_CANDIDATES]:
+            i = int(i)
+            if (text in self.ids[i].lower() or text in self.names[i].lower()) and accept(i):
+                break
+        return self._rows(results)
+
+    def _rows(self, indexes):
+        return [{"学号": self.ids[i], "姓名": self.names[i], "班级": self.classes[i]} for i in indexes]
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def get_student_index(version):
+    """按数据版本号缓存检索索引，写入后下一次检索时重建"""
+    db = connect_db(readonly=True, min_version=version)
+    if db is None:
+        raise RuntimeError("数据库连接失败")
+    cursor = db.cursor()
+    try:
+        cursor.execute("SELECT student_id, name, class FROM student")
+        return StudentSearchIndex(cursor.fetchall())
+    finally:
+        cursor.close()
+        db.close()
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_class_names(version):
+    """按数据版本号缓存的班级列表（检索框的班级下拉选项），无需为此构建完整的检索索引"""
+    db = connect_db(readonly=True, min_version=version)
+    if db is None:
+        raise RuntimeError("数据库连接失败")
+    cursor = db.cursor()
+    try:
+        cursor.execute("SELECT DISTINCT class FROM student")
+        # 与检索索引一致，班级为空的学生归入空字符串
+        return sorted({str(row[0] or "") for row in cursor.fetchall()})
+    finally:
+        cursor.close()
+        db.close()
+
+# ---------------------- 请求合并（single-flight） ----------------------
+class _Call:
+    """一次进行中的计算"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """相同键的并发请求只执行一次计算，其余请求等待并共享同一个结果
+
+    键的第一个元素是计算名称，用于分类统计。共享的结果会被多个会话同时读取，调用方不能修改它。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = defaultdict(lambda: {"请求数": 0, "实际计算": 0, "合并请求": 0})
+
+    def do(self, key, fn):
+        with self._lock:
+            stat = self._stats[key[0]]
+            stat["请求数"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                stat["实际计算"] += 1
+            else:
+                stat["合并请求"] += 1
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                # 包括Streamlit的 RerunException/StopException（BaseException子类），否则等待者会拿到None
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+        if call.error is not None:
+            if leader or isinstance(call.error, Exception):
+                raise call.error
+            # 重跑/停止等控制流异常只属于发起计算的会话，等待者得到普通异常
+            raise RuntimeError("合并的计算被中断，请重试") from call.error
+        return call.result
+
+    def stats(self):
+        """各计算的请求数、实际计算次数和被合并的请求数"""
+        with self._lock:
+            return {name: dict(stat) for name, stat in self._stats.items()}
+
+@st.cache_resource
+def _singleflight():
+    return SingleFlight()
+
+singleflight = _singleflight()
+
+def compute_ranking(version=None):
+    """一次关联查询计算所有学生的简单平均绩点和学分加权绩点，按简单平均降序排名，暂无学生时返回空列表
+
+    两种绩点同时算出，切换计算方式时用 rank_by_gpa 重新排序即可，无需再次查询。
+    version 为结果将被缓存的数据版本号，只使用已追上该版本的副本。
+    """
+    db = connect_db(readonly=True, min_version=version)
+    if db is None:
+        raise RuntimeError("数据库连接失败")
+    cursor = db.cursor()
+    try:
+        cursor.execute(RANKING_SQL)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        db.close()
+    if not rows:
+        return []
+    
+    df = pd.DataFrame(rows, columns=["学号", "姓名", "班级", "成绩", "学分"])
+    stu_codes, stu_ids = pd.factorize(df["学号"])
+    averages = average_gpa(
+        stu_codes, len(stu_ids), df["成绩"].astype(float).to_numpy(), df["学分"].astype(float).to_numpy()
+    )
+    info = df.drop_duplicates("学号")
+    rank_data = [
+        {
+            "排名": "",  # 占位，rank_by_gpa 填充
+            "学号": stu_id,
+            "姓名": stu_name,
+            "班级": stu_class,
+            "平均绩点": round(float(simple), 2),
+            "学分加权绩点": round(float(weighted), 2)
+        }
+        for stu_id, stu_name, stu_class, simple, weighted in zip(
+            info["学号"], info["姓名"], info["班级"], averages["简单平均"], averages["学分加权"]
+        )
+    ]
+    return rank_by_gpa(rank_data, "简单平均")
+
+def rank_by_gpa(rank_data, mode):
+    """按所选计算方式的绩点降序排名，返回新列表（展示与导出共用，不修改缓存中的排名数据）"""
+    column = GPA_MODES[mode]
+    ordered = sorted(rank_data, key=lambda x: x[column], reverse=True)
+    return [{**row, "排名": i + 1} for i, row in enumerate(ordered)]
+
+def compute_class_course_report(class_name, course_id, dpi=300, version=None):
+    """查询班级+课程成绩并生成图表
+
+    返回 {"course_name", "img", "stats"}：课程不存在时 course_name 为None，无成绩时 img/stats 为None。
+    version 的含义同 compute_ranking。
+    """
+    # 课程名称和成绩两条查询互不依赖，并发执行；成绩流式分块累加，不保留完整成绩列表
+    course_rows, scores = fetch_concurrently([
+        (COURSE_NAME_SQL, (course_id,)),
+        (CLASS_COURSE_SCORES_SQL, (class_name, course_id), ScoreStats.from_cursor),
+    ], min_version=version)
+    if not course_rows:
+        return {"course_name": None, "img": None, "stats": None}
+    course_name = course_rows[0][0]
+    
+    if scores.count == 0:
+        return {"course_name": course_name, "img": None, "stats": None}
+    # 生成图表和统计信息
+    img, stats = generate_score_chart(class_name, course_id, course_name, scores, dpi=dpi)
+    return {"course_name": course_name, "img": img, "stats": stats}
+
+def compute_course_class_stats(course_id, version=None):
+    """一次扫描某课程全部成绩，按班级分别累加，返回 {班级: ScoreStats}
+
+    各班级的部分结果可用 ScoreStats.merge_all 合并为年级或全校统计；version 的含义同 compute_ranking。
+    """
+    db = connect_db(readonly=True, min_version=version)
+    if db is None:
+        raise RuntimeError("数据库连接失败")
+    cursor = db.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute("""
+            SELECT s.class, sc.score
+            FROM student s
+            JOIN score sc ON s.student_id = sc.student_id
+            WHERE sc.course_id = %s
+        """, (course_id,))
+        partials = defaultdict(ScoreStats)
+        while True:
+            rows = cursor.fetchmany(STATS_CHUNK_SIZE)
+            if not rows:
+                break
+            by_class = defaultdict(list)
+            for class_name, score in rows:
+                by_class[class_name].append(score)
+            for class_name, scores in by_class.items():
+                partials[class_name].update(scores)
+        return dict(partials)
+    finally:
+        cursor.close()
+        db.close()
+
+# ---------------------- 报表预热 ----------------------
+# 写入后等待的防抖秒数：一批连续的成绩修改只触发一次预热
+WARMER_DEBOUNCE_SECONDS = float(os.environ.get("WARMER_DEBOUNCE_SECONDS", 2))
+# 预热并发数
+WARMER_CONCURRENCY = int(os.environ.get("WARMER_CONCURRENCY", 2))
+
+# 报表数据结构的版本号，参与缓存键：修改排名或统计报表的字段后须加1，
+# 共享缓存中旧结构的报表（TTL内可能仍在）不会被新代码读到
+REPORT_FORMAT_VERSION = 2
+
+RANKING_REPORT = ("绩点排名",)
+
+def _report_cache_key(key, version):
+    return ("report", REPORT_FORMAT_VERSION) + key + (version,)
+
+def class_course_report_key(class_name, course_id, dpi):
+    return ("班级+学科成绩统计", class_name, course_id, dpi)
+
+class ReportWarmer:
+    """成绩写入提交后在后台重算排名和受影响的班级+课程统计，用户请求直接使用预计算结果
+
+    报表存放在共享缓存中，键带数据版本号，只有当前版本的报表才会被使用；状态表只反映本进程的预热记录。
+    """
+    def __init__(self, debounce_seconds, concurrency):
+        self._debounce_seconds = debounce_seconds
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="report-warmer")
+        self._lock = threading.Lock()
+        self._timer = None
+        self._pending = []
+        # 报表键 -> {"version", "value", "computed_at", "seconds", "state"}
+        self._reports = {}
+
+    def notify(self, class_name=None, course_id=None, student_id=None, scores_changed=True):
+        """登记一次写入，防抖后预热；None表示该维度全部受影响（学生会在预热时解析为班级）
+
+        scores_changed=False 表示写入不改变任何班级+课程的成绩（如新增学生、修改姓名），只重算排名。
+        """
+        with self._lock:
+            if scores_changed:
+                self._pending.append((class_name, course_id, student_id))
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self._debounce_seconds, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def get(self, key):
+        """从共享缓存返回当前数据版本的报表（可能由其他进程预热），没有时返回None"""
+        return get_cache().get(_report_cache_key(key, data_version()))
+
+    def put(self, key, value, version, seconds=0.0):
+        """保存报表（预热结果或用户请求时计算的结果）到共享缓存，本进程记录其状态"""
+        get_cache().set(_report_cache_key(key, version), value, ttl=REPORT_CACHE_TTL)
+        with self._lock:
+            current = self._reports.get(key)
+            if current and current["version"] > version and current["state"] == "已完成":
+                return
+            self._reports[key] = {
+                "version": version, "computed_at": time.time(),
+                "seconds": seconds, "state": "已完成"
+            }
+
+    def _resolve_classes(self, student_ids):
+        """学号 -> 班级"""
+        if not student_ids:
+            return {}
+        db = connect_db()
+        if db is None:
+            return {}
+        cursor = db.cursor()
+        try:
+            ids = sorted(student_ids)
+            cursor.execute(
+                "SELECT student_id, class FROM student WHERE student_id IN (%s)" % ", ".join(["%s"] * len(ids)),
+                ids
+            )
+            return dict(cursor.fetchall())
+        finally:
+            cursor.close()
+            db.close()
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending, self._timer = self._pending, [], None
+            known = [key for key in self._reports if key[0] == "班级+学科成绩统计"]
+        try:
+            classes = self._resolve_classes({sid for _, _, sid in pending if sid})
+        except Exception:
+            classes = {}
+        
+        # 计算受影响的（班级, 课程）：已缓存过的报表按通配条件匹配，明确的组合直接加入
+        targets = set()
+        for class_name, course_id, student_id in pending:
+            if student_id:
+                class_name = classes.get(student_id, class_name)
+                if class_name is None:
+                    continue
+            for key in known:
+                if class_name in (None, key[1]) and course_id in (None, key[2]):
+                    targets.add(key)
+            if class_name and course_id:
+                targets.add(class_course_report_key(class_name, course_id, chart_dpi_for_budget() or CHART_DPI_LEVELS[-1]))
+        
+        version = data_version()
+        self._submit(RANKING_REPORT, version, lambda: compute_ranking(version))
+        for key in targets:
+            _, class_name, course_id, dpi = key
+            self._submit(key, version, lambda c=class_name, k=course_id, d=dpi: compute_class_course_report(c, k, d, version))
+
+    def _submit(self, key, version, fn):
+        with self._lock:
+            entry = self._reports.setdefault(key, {"version": -1, "computed_at": None, "seconds": 0.0})
+            entry["state"] = "排队中"
+        self._executor.submit(self._warm, key, version, fn)
+
+    def _warm(self, key, version, fn):
+        with self._lock:
+            self._reports[key]["state"] = "计算中"
+        start = time.perf_counter()
+        try:
+            # 刚写入后副本通常还没追上该版本，计算函数会回退到主库；与用户请求共用single-flight
+            value = singleflight.do(key + (version,), fn)
+        except Exception:
+            with self._lock:
+                self._reports[key]["state"] = "失败"
+            return
+        self.put(key, value, version, time.perf_counter() - start)
+
+    def status(self):
+        """各报表的新鲜度"""
+        current = data_version()
+        rows = []
+        with self._lock:
+            items = sorted(self._reports.items(), key=lambda x: x[0])
+        for key, entry in items:
+            if entry["state"] != "已完成":
+                state = entry["state"]
+            else:
+                state = "新鲜" if entry["version"] == current else "过期"
+            rows.append({
+                "报表": " / ".join(str(k) for k in key),
+                "状态": state,
+                "计算时间": time.strftime("%H:%M:%S", time.localtime(entry["computed_at"])) if entry["computed_at"] else "——",
+                "耗时(秒)": round(entry["seconds"], 2)
+            })
+        return rows
+
+@st.cache_resource
+def _report_warmer():
+    return ReportWarmer(WARMER_DEBOUNCE_SECONDS, WARMER_CONCURRENCY)
+
+report_warmer = _report_warmer()
+
+# ---------------------- 登录页面 ----------------------
+def login_page():
+    st.title("📚 学生成绩管理系统 - 登录")
+    st.divider()
+    if sqlite_missing_admin():
+        st.warning("⚠️ 数据库中还没有账号：请设置 SQLITE_ADMIN_PASSWORD 环境变量后重启，将创建管理员账号 admin")
+    
+    # 登录表单
+    with st.form("login_form"):
+        username = st.text_input("账号", placeholder="请输入登录账号")
+        password = st.text_input("密码", type="password", placeholder="请输入登录密码")
+        submit_btn = st.form_submit_button("登录", type="primary")
+        
+        if submit_btn:
+            if not (username and password):
+                st.warning("⚠️ 账号和密码不能为空！")
+                return
+            
+            # 连接数据库验证账号密码
+            db = connect_db()
+            if db:
+                cursor = db.cursor()
+                try:
+                    # 查询用户信息
+                    cursor.execute("SELECT * FROM user WHERE username = %s", (username,))
+                    user = cursor.fetchone()
+                    if user:
+                        # 验证密码（明文，适配测试场景）
+                        if user[2] == password:
+                            # 登录成功，保存用户状态
+                            st.session_state["is_login"] = True
+                            st.session_state["username"] = username
+                            st.session_state["role"] = user[3]  # admin/teacher
+                            st.success("✅ 登录成功！正在跳转...")
+                            st.rerun()  # 刷新页面跳主界面
+                        else:
+                            st.error("❌ 密码错误！")
+                    else:
+                        st.error("❌ 账号不存在！")
+                except Exception as e:
+                    st.error(f"登录失败：{str(e)}")
+                finally:
+                    cursor.close()
+                    db.close()
+
+# ---------------------- 主功能页面 ----------------------
+def main_page():
+    # 侧边栏：用户信息 + 退出登录
+    with st.sidebar:
+        st.header(f"当前登录：{st.session_state['username']}")
+        st.caption(f"角色：{st.session_state['role']}")
+        if st.button("退出登录", type="secondary"):
+            st.session_state.clear()
+            st.rerun()
+        st.divider()
+        # 请求合并统计（仅管理员可见）
+        if st.session_state["role"] == "admin":
+            with st.expander("🔗 请求合并统计", expanded=False):
+                flight_stats = singleflight.stats()
+                if flight_stats:
+                    st.dataframe(
+                        [{"计算": name, **stat} for name, stat in flight_stats.items()],
+                        use_container_width=True, hide_index=True
+                    )
+                else:
+                    st.write("暂无记录")
+        # 只读副本状态（仅管理员可见，配置了副本时显示）
+        if DB_REPLICAS and st.session_state["role"] == "admin":
+            with st.expander("🩺 只读副本状态", expanded=False):
+                st.dataframe(replica_health.status(DB_REPLICAS), use_container_width=True, hide_index=True)
+        # 报表预热状态（仅管理员可见）
+        if st.session_state["role"] == "admin":
+            with st.expander("🔥 报表预热状态", expanded=False):
+                warm_status = report_warmer.status()
+                if warm_status:
+                    st.dataframe(warm_status, use_container_width=True, hide_index=True)
+                else:
+                    st.write("暂无预计算报表")
+        # 内存分析报告（仅管理员可见，需开启 MEMORY_PROFILING=1）
+        if MEMORY_PROFILING and st.session_state["role"] == "admin":
+            with st.expander("🧠 内存分析", expanded=False):
+                st.caption(f"单次请求内存预算：{MEMORY_BUDGET_MB:g} MB；开启内存分析时各会话的页面操作串行执行")
+                with _memory_lock:
+                    report = {name: dict(stat) for name, stat in MEMORY_STATS.items()}
+                if not report:
+                    st.write("暂无记录")
+                for name, stat in sorted(report.items(), key=lambda x: -x[1]["最大峰值(MB)"]):
+                    st.write(f"**{name}**：{stat['次数']}次，最近 {stat['最近峰值(MB)']} MB，最大 {stat['最大峰值(MB)']} MB")
+                    if stat["分配位置"]:
+                        st.dataframe(stat["分配位置"], use_container_width=True)
+        # 性能分析开关（仅管理员可见），结果在页面运行结束后显示在侧边栏底部
+        if st.session_state["role"] == "admin":
+            with st.expander("⏱️ 性能分析", expanded=False):
+                st.toggle("分析每次页面运行", key="profiling")
+                st.selectbox(
+                    "分析方式", PROFILE_MODES, key="profile_mode",
+                    help="当前Python版本的cProfile会记录所有线程，多人同时使用时建议用采样分析" if CPROFILE_ALL_THREADS else None
+                )
+    
+    # 主功能菜单（完整功能）
+    menu = st.selectbox(
+        "请选择功能",
+        [
+            "学生信息查询", "新增学生", "修改学生信息", "删除学生",
+            "课程管理", "成绩管理", "绩点排名", "班级+学科成绩统计",
+            "成绩总表", "数据导出与快照"
+        ],
+        index=0,
+        key="menu"
+    )
+    
+    # 1. 学生信息查询（所有人可看）
+    if menu == "学生信息查询":
+        st.subheader("🔍 学生信息+成绩+绩点查询")
+        
+        # 不知道学号时，先按姓名/学号片段/班级检索
+        with st.expander("🔎 不知道学号？按姓名、学号片段或班级检索", expanded=False):
+            try:
+                version = data_version()
+                col1, col2 = st.columns([3, 1])
+                keyword = col1.text_input("姓名或学号（支持前缀和部分匹配）", placeholder="例如：张 或 2401")
+                class_filter = col2.selectbox("班级", ["全部班级"] + load_class_names(version))
+                class_filter = None if class_filter == "全部班级" else class_filter
+                # 只有真正检索时才构建索引，打开查询页只查询班级列表
+                if keyword or class_filter:
+                    results = get_student_index(version).search(keyword, class_filter, limit=50)
+                    if results:
+                        st.dataframe(results, use_container_width=True, hide_index=True)
+                        st.caption("最多显示前50条结果，请复制学号到下方查询")
+                    else:
+                        st.info("ℹ️ 没有匹配的学生！")
+            except Exception as e:
+                st.error(f"检索失败：{str(e)}")
+        
+        with st.form("query_form"):
+            stu_id = st.text_input("请输入学生学号", placeholder="例如：2024001")
+            gpa_mode = st.radio("绩点计算方式", list(GPA_MODES), horizontal=True)
+            query_btn = st.form_submit_button("查询")
+        
+        # 下载按钮不能放在表单内，结果在表单外展示
+        if query_btn:
+            if not stu_id:
+                st.warning("⚠️ 请输入学号！")
+                return
+            
+            try:
+                # 学生基础信息和成绩两条查询互不依赖，并发执行
+                stu_rows, scores = fetch_concurrently([
+                    (STUDENT_INFO_SQL, (stu_id,)),
+                    (STUDENT_SCORES_SQL, (stu_id,)),
+                ])
+            except Exception as e:
+                st.error(f"查询失败：{str(e)}")
+                return
+            stu_info = stu_rows[0] if stu_rows else None
+            if not stu_info:
+                st.info("ℹ️ 未查询到该学生信息！")
+                return
+            
+            # 展示基础信息
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("学号", stu_info[0])
+            col2.metric("姓名", stu_info[1])
+            col3.metric("性别", stu_info[2])
+            col4.metric("班级", stu_info[3])
+            st.divider()
+            
+            # 整理导出数据
+            export_data = []
+            # 基础信息行
+            export_data.append({
+                "学号": stu_info[0],
+                "姓名": stu_info[1],
+                "性别": stu_info[2],
+                "班级": stu_info[3],
+                "课程名称": "——",
+                "学分": "——",
+                "成绩": "——",
+                "绩点": "——"
+            })
+            
+            if scores:
+                st.subheader("📝 成绩与绩点")
+                course_scores = [score for _, score, _ in scores]
+                course_credits = [credit for _, _, credit in scores]
+                # 整理成绩数据（单门绩点一次查表换算）
+                score_data = []
+                for (course, score, credit), gpa in zip(scores, calculate_gpa_array(course_scores)):
+                    score_data.append({
+                        "课程名称": course,
+                        "学分": credit,
+                        "成绩": score,
+                        "单门绩点": float(gpa)
+                    })
+                    export_data.append({
+                        "学号": stu_info[0],
+                        "姓名": "",
+                        "性别": "",
+                        "班级": "",
+                        "课程名称": course,
+                        "学分": credit,
+                        "成绩": score,
+                        "绩点": round(float(gpa), 1)
+                    })
+                # 展示表格
+                st.dataframe(score_data, use_container_width=True)
+                # 显示所选方式的平均绩点
+                averages = average_gpa(np.zeros(len(scores), dtype=np.intp), 1, course_scores, course_credits)
+                avg_gpa = round(float(averages[gpa_mode][0]), 2)
+                st.metric(f"📊 {GPA_MODES[gpa_mode]}", avg_gpa)
+                # 添加平均绩点到导出数据
+                export_data.append({
+                    "学号": stu_info[0],
+                    "姓名": "",
+                    "性别": "",
+                    "班级": "",
+                    "课程名称": GPA_MODES[gpa_mode],
+                    "学分": "——",
+                    "成绩": "——",
+                    "绩点": avg_gpa
+                })
+            else:
+                st.info("ℹ️ 该学生暂无选课/成绩记录！")
+                export_data.append({
+                    "学号": stu_info[0],
+                    "姓名": "",
+                    "性别": "",
+                    "班级": "",
+                    "课程名称": "无选课记录",
+                    "学分": "——",
+                    "成绩": "无成绩",
+                    "绩点": 0.0
+                })
+            
+            # 导出功能
+            st.divider()
+            col_export1, col_export2 = st.columns(2)
+            with col_export1:
+                # 导出Excel
+                excel_data = export_to_excel(export_data, f"学生{stu_id}信息")
+                st.download_button(
+                    label="📥 导出Excel文件",
+                    data=excel_data,
+                    file_name=f"学生{stu_id}信息.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+            with col_export2:
+                # 导出CSV（兼容更多设备）
+                csv_data = export_to_csv(export_data, f"学生{stu_id}信息")
+                st.download_button(
+                    label="📥 导出CSV文件",
+                    data=csv_data,
+                    file_name=f"学生{stu_id}信息.csv",
+                    mime="text/csv"
+                )
+    
+    # 2. 新增学生（仅管理员可操作）
+    if menu == "新增学生":
+        st.subheader("➕ 新增学生")
+        # 权限判断
+        if st.session_state["role"] != "admin":
+            st.error("❌ 无权限！仅管理员可新增学生")
+            return
+        
+        with st.form("add_stu_form"):
+            col1, col2 = st.columns(2)
+            stu_id = col1.text_input("学号", placeholder="唯一，例如：2024001")
+            stu_name = col2.text_input("姓名", placeholder="例如：张三")
+            stu_gender = col1.selectbox("性别", ["男", "女"])
+            stu_class = col2.text_input("班级", placeholder="例如：计科2401")
+            add_btn = st.form_submit_button("提交新增", type="primary")
+            
+            if add_btn:
+                if not (stu_id and stu_name and stu_gender and stu_class):
+                    st.warning("⚠️ 所有字段不能为空！")
+                    return
+                
+                db = connect_db()
+                if db:
+                    cursor = db.cursor()
+                    version = None
+                    try:
+                        # 检查学号是否已存在
+                        cursor.execute("SELECT * FROM student WHERE student_id = %s", (stu_id,))
+                        if cursor.fetchone():
+                            st.error("❌ 学号已存在！")
+                            return
+                        # 新增学生
+                        cursor.execute(
+                            "INSERT INTO student (student_id, name, gender, class) VALUES (%s, %s, %s, %s)",
+                            (stu_id, stu_name, stu_gender, stu_class)
+                        )
+                        version = bump_data_marker(db)
+                        db.commit()
+                    except Exception as e:
+                        db.rollback()
+                        st.error(f"新增失败：{str(e)}")
+                    finally:
+                        cursor.close()
+                        db.close()
+                    if version is not None:
+                        mark_write(version)
+                        # 新学生还没有成绩，只影响排名
+                        report_warmer.notify(scores_changed=False)
+                        st.success("✅ 学生新增成功！")
+                        # 刷新表单
+                        st.rerun()
+    
+    # 3. 修改学生信息（仅管理员可操作）
+    if menu == "修改学生信息":
+        st.subheader("✏️ 修改学生信息")
+        # 权限判断
+        if st.session_state["role"] != "admin":
+            st.error("❌ 无权限！仅管理员可修改学生信息")
+            return
+        
+        # 选择修改类型
+        update_type = st.radio("修改类型", ["基础信息", "成绩"])
+        
+        with st.form("update_stu_form"):
+            stu_id = st.text_input("学生学号", placeholder="例如：2024001")
+            
+            if update_type == "基础信息":
+                col1, col2 = st.columns(2)
+                new_name = col1.text_input("新姓名", placeholder="例如：张三")
+                new_gender = col2.selectbox("新性别", ["男", "女"])
+                new_class = col1.text_input("新班级", placeholder="例如：计科2401")
+            else:
+                col1, col2 = st.columns(2)
+                course_id = col1.text_input("课程ID", placeholder="例如：C001")
+                new_score = col2.number_input("新成绩", min_value=0.0, max_value=100.0, step=0.5)
+            
+            update_btn = st.form_submit_button("提交修改", type="primary")
+            
+            if update_btn:
+                if not stu_id:
+                    st.warning("⚠️ 请输入学生学号！")
+                    return
+                
+                db = connect_db()
+                if db:
+                    cursor = db.cursor()
+                    version = None
+                    try:
+                        # 检查学生是否存在
+                        cursor.execute("SELECT * FROM student WHERE student_id = %s", (stu_id,))
+                        stu_row = cursor.fetchone()
+                        if not stu_row:
+                            st.error("❌ 学生不存在！")
+                            return
+                        
+                        if update_type == "基础信息":
+                            if not (new_name and new_gender and new_class):
+                                st.warning("⚠️ 所有基础信息字段不能为空！")
+                                return
+                            # 修改基础信息
+                            cursor.execute(
+                                "UPDATE student SET name = %s, gender = %s, class = %s WHERE student_id = %s",
+                                (new_name, new_gender, new_class, stu_id)
+                            )
+                        else:
+                            if not course_id:
+                                st.warning("⚠️ 课程ID不能为空！")
+                                return
+                            # 验证成绩
+                            score_valid, is_ok = validate_score(new_score)
+                            if not is_ok:
+                                return
+                            # 检查课程是否存在
+                            cursor.execute("SELECT * FROM course WHERE course_id = %s", (course_id,))
+                            if not cursor.fetchone():
+                                st.error("❌ 课程不存在！")
+                                return
+                            # 检查成绩记录是否存在
+                            cursor.execute("SELECT * FROM score WHERE student_id = %s AND course_id = %s", (stu_id, course_id))
+                            if not cursor.fetchone():
+                                st.error("❌ 该学生未选此课程，无成绩可修改！")
+                                return
+                            # 修改成绩
+                            cursor.execute(
+                                "UPDATE score SET score = %s WHERE student_id = %s AND course_id = %s",
+                                (new_score, stu_id, course_id)
+                            )
+                        
+                        version = bump_data_marker(db)
+                        db.commit()
+                        changed = cursor.rowcount
+                    except Exception as e:
+                        db.rollback()
+                        st.error(f"修改失败：{str(e)}")
+                    finally:
+                        cursor.close()
+                        db.close()
+                    if version is not None:
+                        mark_write(version)
+                        if update_type == "成绩":
+                            report_warmer.notify(class_name=stu_row[3], course_id=course_id)
+                        elif stu_row[3] != new_class:
+                            # 转班：原班级和新班级的统计都变了
+                            report_warmer.notify(class_name=stu_row[3])
+                            report_warmer.notify(class_name=new_class)
+                        else:
+                            report_warmer.notify(scores_changed=False)
+                        if changed > 0:
+                            st.success("✅ 信息修改成功！")
+                        else:
+                            st.info("ℹ️ 无数据被修改！")
+    
+    # 4. 删除学生（仅管理员可操作）
+    if menu == "删除学生":
+        st.subheader("🗑️ 删除学生")
+        # 权限判断
+        if st.session_state["role"] != "admin":
+            st.error("❌ 无权限！仅管理员可删除学生")
+            return
+        
+        with st.form("delete_stu_form"):
+            stu_id = st.text_input("请输入要删除的学生学号", placeholder="例如：2024001")
+            # 二次确认（防止误删）
+            confirm_delete = st.checkbox("我确认要删除该学生（会同步删除其成绩）")
+            delete_btn = st.form_submit_button("删除学生", type="primary")
+            
+            if delete_btn:
+                if not stu_id:
+                    st.warning("⚠️ 请输入要删除的学生学号！")
+                    return
+                if not confirm_delete:
+                    st.warning("⚠️ 请勾选确认删除！")
+                    return
+                
+                db = connect_db()
+                if db:
+                    cursor = db.cursor()
+                    version = None
+                    try:
+                        # 检查学生是否存在
+                        cursor.execute("SELECT * FROM student WHERE student_id = %s", (stu_id,))
+                        stu_row = cursor.fetchone()
+                        if not stu_row:
+                            st.error("❌ 该学生不存在！")
+                            return
+                        
+                        # 先删除该学生的成绩（外键关联）
+                        cursor.execute("DELETE FROM score WHERE student_id = %s", (stu_id,))
+                        # 再删除学生信息
+                        cursor.execute("DELETE FROM student WHERE student_id = %s", (stu_id,))
+                        version = bump_data_marker(db)
+                        db.commit()
+                        changed = cursor.rowcount
+                    except Exception as e:
+                        db.rollback()
+                        st.error(f"删除失败：{str(e)}")
+                    finally:
+                        cursor.close()
+                        db.close()
+                    if version is not None:
+                        mark_write(version)
+                        report_warmer.notify(class_name=stu_row[3])
+                        if changed > 0:
+                            st.success("✅ 学生删除成功（含关联成绩）！")
+                        else:
+                            st.info("ℹ️ 无学生数据被删除！")
+                        # 刷新表单
+                        st.rerun()
+    
+    # 5. 课程管理（仅管理员可操作）
+    if menu == "课程管理":
+        st.subheader("📚 课程管理")
+        # 权限判断
+        if st.session_state["role"] != "admin":
+            st.error("❌ 无权限！仅管理员可管理课程")
+            return
+        
+        # 课程管理子菜单
+        course_submenu = st.radio("课程操作", ["新增课程", "修改课程", "删除课程"])
+        
+        # 5.1 新增课程
+        if course_submenu == "新增课程":
+            with st.form("add_course_form"):
+                col1, col2, col3 = st.columns(3)
+                course_id = col1.text_input("课程ID", placeholder="例如：C001")
+                course_name = col2.text_input("课程名称", placeholder="例如：Python程序设计")
+                credit = col3.number_input("学分", min_value=1, max_value=10, step=1)
+                add_course_btn = st.form_submit_button("新增课程", type="primary")
+                
+                if add_course_btn:
+                    if not (course_id and course_name):
+                        st.warning("⚠️ 课程ID和名称不能为空！")
+                        return
+                    
+                    db = connect_db()
+                    if db:
+                        cursor = db.cursor()
+                        version = None
+                        try:
+                            # 检查课程ID是否已存在
+                            cursor.execute("SELECT * FROM course WHERE course_id = %s", (course_id,))
+                            if cursor.fetchone():
+                                st.error("❌ 课程ID已存在！")
+                                return
+                            # 新增课程
+                            cursor.execute(
+                                "INSERT INTO course (course_id, course_name, credit) VALUES (%s, %s, %s)",
+                                (course_id, course_name, credit)
+                            )
+                            version = bump_data_marker(db)
+                            db.commit()
+                        except Exception as e:
+                            db.rollback()
+                            st.error(f"新增失败：{str(e)}")
+                        finally:
+                            cursor.close()
+                            db.close()
+                        if version is not None:
+                            mark_write(version)
+                            st.success("✅ 课程新增成功！")
+        
+        # 5.2 修改课程
+        elif course_submenu == "修改课程":
+            with st.form("update_course_form"):
+                col1, col2, col3 = st.columns(3)
+                course_id = col1.text_input("课程ID", placeholder="例如：C001")
+                new_course_name = col2.text_input("新课程名称", placeholder="例如：Python程序设计")
+                new_credit = col3.number_input("新学分", min_value=1, max_value=10, step=1)
+                update_course_btn = st.form_submit_button("修改课程", type="primary")
+                
+                if update_course_btn:
+                    if not (course_id and new_course_name):
+                        st.warning("⚠️ 课程ID和新名称不能为空！")
+                        return
+                    
+                    db = connect_db()
+                    if db:
+                        cursor = db.cursor()
+                        version = None
+                        try:
+                            # 检查课程是否存在
+                            cursor.execute("SELECT * FROM course WHERE course_id = %s", (course_id,))
+                            if not cursor.fetchone():
+                                st.error("❌ 课程不存在！")
+                                return
+                            # 修改课程
+                            cursor.execute(
+                                "UPDATE course SET course_name = %s, credit = %s WHERE course_id = %s",
+                                (new_course_name, new_credit, course_id)
+                            )
+                            version = bump_data_marker(db)
+                            db.commit()
+                            changed = cursor.rowcount
+                        except Exception as e:
+                            db.rollback()
+                            st.error(f"修改失败：{str(e)}")
+                        finally:
+                            cursor.close()
+                            db.close()
+                        if version is not None:
+                            mark_write(version)
+                            report_warmer.notify(course_id=course_id)
+                            if changed > 0:
+                                st.success("✅ 课程修改成功！")
+                            else:
+                                st.info("ℹ️ 无数据被修改！")
+        
+        # 5.3 删除课程
+        elif course_submenu == "删除课程":
+            with st.form("delete_course_form"):
+                course_id = st.text_input("课程ID", placeholder="例如：C001")
+                confirm_delete = st.checkbox("我确认要删除该课程")
+                delete_course_btn = st.form_submit_button("删除课程", type="primary")
+                
+                if delete_course_btn:
+                    if not course_id:
+                        st.warning("⚠️ 请输入课程ID！")
+                        return
+                    if not confirm_delete:
+                        st.warning("⚠️ 请勾选确认删除！")
+                        return
+                    
+                    db = connect_db()
+                    if db:
+                        cursor = db.cursor()
+                        version = None
+                        try:
+                            # 检查课程是否存在
+                            cursor.execute("SELECT * FROM course WHERE course_id = %s", (course_id,))
+                            if not cursor.fetchone():
+                                st.error("❌ 课程不存在！")
+                                return
+                            # 删除课程
+                            cursor.execute("DELETE FROM course WHERE course_id = %s", (course_id,))
+                            version = bump_data_marker(db)
+                            db.commit()
+                            changed = cursor.rowcount
+                        except Exception as e:
+                            db.rollback()
+                            st.error(f"删除失败：{str(e)}")
+                        finally:
+                            cursor.close()
+                            db.close()
+                        if version is not None:
+                            mark_write(version)
+                            report_warmer.notify(course_id=course_id)
+                            if changed > 0:
+                                st.success("✅ 课程删除成功！")
+                            else:
+                                st.info("ℹ️ 无课程数据被删除！")
+    
+    # 6. 成绩管理（仅管理员可操作）
+    if menu == "成绩管理":
+        st.subheader("📖 成绩管理")
+        if st.session_state["role"] != "admin":
+            st.error("❌ 无权限！仅管理员可管理成绩")
+            return
+        
+        # 子菜单：新增/修改/删除成绩
+        sub_menu = st.radio("请选择操作", ["新增成绩", "修改成绩", "删除成绩"])
+        
+        # 6.1 新增成绩
+        if sub_menu == "新增成绩":
+            with st.form("add_score_form"):
+                col1, col2, col3 = st.columns(3)
+                stu_id = col1.text_input("学生学号")
+                course_id = col2.text_input("课程ID")
+                score = col3.number_input("成绩", min_value=0.0, max_value=100.0, step=0.5)
+                add_score_btn = st.form_submit_button("新增成绩", type="primary")
+                
+                if add_score_btn:
+                    if not (stu_id and course_id):
+                        st.warning("⚠️ 学号和课程ID不能为空！")
+                        return
+                    
+                    db = connect_db()
+                    if db:
+                        cursor = db.cursor()
+                        version = None
+                        try:
+                            # 检查学生和课程是否存在
+                            cursor.execute("SELECT * FROM student WHERE student_id = %s", (stu_id,))
+                            if not cursor.fetchone():
+                                st.error("❌ 学生不存在！")
+                                return
+                            cursor.execute("SELECT * FROM course WHERE course_id = %s", (course_id,))
+                            if not cursor.fetchone():
+                                st.error("❌ 课程不存在！")
+                                return
+                            # 检查是否已存在该成绩
+                            cursor.execute("SELECT * FROM score WHERE student_id = %s AND course_id = %s", (stu_id, course_id))
+                            if cursor.fetchone():
+                                st.error("❌ 该学生已存在该课程成绩！")
+                                return
+                            # 新增成绩
+                            cursor.execute(
+                                "INSERT INTO score (student_id, course_id, score) VALUES (%s, %s, %s)",
+                                (stu_id, course_id, score)
+                            )
+                            version = bump_data_marker(db)
+                            db.commit()
+                        except Exception as e:
+                            db.rollback()
+                            st.error(f"新增失败：{str(e)}")
+                        finally:
+                            cursor.close()
+                            db.close()
+                        if version is not None:
+                            mark_write(version)
+                            report_warmer.notify(student_id=stu_id, course_id=course_id)
+                            st.success("✅ 成绩新增成功！")
+        
+        # 6.2 修改成绩
+        elif sub_menu == "修改成绩":
+            with st.form("update_score_form"):
+                col1, col2, col3 = st.columns(3)
+                stu_id = col1.text_input("学生学号")
+                course_id = col2.text_input("课程ID")
+                new_score = col3.number_input("新成绩", min_value=0.0, max_value=100.0, step=0.5)
+                update_score_btn = st.form_submit_button("修改成绩", type="primary")
+                
+                if update_score_btn:
+                    if not (stu_id and course_id):
+                        st.warning("⚠️ 学号和课程ID不能为空！")
+                        return
+                    
+                    db = connect_db()
+                    if db:
+                        cursor = db.cursor()
+                        version = None
+                        try:
+                            # 检查成绩是否存在
+                            cursor.execute("SELECT * FROM score WHERE student_id = %s AND course_id = %s", (stu_id, course_id))
+                            if not cursor.fetchone():
+                                st.error("❌ 该成绩不存在！")
+                                return
+                            # 修改成绩
+                            cursor.execute(
+                                "UPDATE score SET score = %s WHERE student_id = %s AND course_id = %s",
+                                (new_score, stu_id, course_id)
+                            )
+                            version = bump_data_marker(db)
+                            db.commit()
+                            changed = cursor.rowcount
+                        except Exception as e:
+                            db.rollback()
+                            st.error(f"修改失败：{str(e)}")
+                        finally:
+                            cursor.close()
+                            db.close()
+                        if version is not None:
+                            mark_write(version)
+                            report_warmer.notify(student_id=stu_id, course_id=course_id)
+                            if changed > 0:
+                                st.success("✅ 成绩修改成功！")
+                            else:
+                                st.info("ℹ️ 无数据被修改！")
+        
+        # 6.3 删除成绩
+        elif sub_menu == "删除成绩":
+            with st.form("delete_score_form"):
+                col1, col2 = st.columns(2)
+                stu_id = col1.text_input("学生学号")
+                course_id = col2.text_input("课程ID")
+                confirm_delete = st.checkbox("我确认要删除该成绩")
+                delete_score_btn = st.form_submit_button("删除成绩", type="primary")
+                
+                if delete_score_btn:
+                    if not (stu_id and course_id):
+                        st.warning("⚠️ 学号和课程ID不能为空！")
+                        return
+                    if not confirm_delete:
+                        st.warning("⚠️ 请勾选确认删除！")
+                        return
+                    
+                    db = connect_db()
+                    if db:
+                        cursor = db.cursor()
+                        version = None
+                        try:
+                            # 检查成绩是否存在
+                            cursor.execute("SELECT * FROM score WHERE student_id = %s AND course_id = %s", (stu_id, course_id))
+                            if not cursor.fetchone():
+                                st.error("❌ 该成绩不存在！")
+                                return
+                            # 删除成绩
+                            cursor.execute("DELETE FROM score WHERE student_id = %s AND course_id = %s", (stu_id, course_id))
+                            version = bump_data_marker(db)
+                            db.commit()
+                            changed = cursor.rowcount
+                        except Exception as e:
+                            db.rollback()
+                            st.error(f"删除失败：{str(e)}")
+                        finally:
+                            cursor.close()
+                            db.close()
+                        if version is not None:
+                            mark_write(version)
+                            report_warmer.notify(student_id=stu_id, course_id=course_id)
+                            if changed > 0:
+                                st.success("✅ 成绩删除成功！")
+                            else:
+                                st.info("ℹ️ 无成绩数据被删除！")
+    
+    # 7. 绩点排名（所有人可看）
+    if menu == "绩点排名":
+        st.subheader("🏆 学生绩点排名（降序）")
+        gpa_mode = st.radio("绩点计算方式", list(GPA_MODES), horizontal=True)
+        query_rank_btn = st.button("刷新排名", type="primary")
+        
+        if query_rank_btn:
+            # 优先使用写入后预热好的排名
+            rank_data = report_warmer.get(RANKING_REPORT)
+            if rank_data is None:
+                try:
+                    version = data_version()
+                    # 同一时刻多个会话刷新排名时只计算一次
+                    rank_data = singleflight.do(RANKING_REPORT + (version,), lambda: compute_ranking(version))
+                except Exception as e:
+                    st.error(f"排名查询失败：{str(e)}")
+                    return
+                report_warmer.put(RANKING_REPORT, rank_data, version)
+            if not rank_data:
+                st.info("ℹ️ 暂无学生数据！")
+                return
+            rank_data = rank_by_gpa(rank_data, gpa_mode)
+            export_rank_data = rank_data
+            file_prefix = f"学生绩点排名（{gpa_mode}）"
+            
+            # 展示排名表格
+            st.dataframe(rank_data, use_container_width=True)
+            
+            # 导出排名数据（按内存预算降级）
+            st.divider()
+            export_cols = len(export_rank_data[0])
+            if not columnar_export_allowed(len(export_rank_data), export_cols):
+                st.warning("⚠️ 排名数据超出单次请求内存预算，请在「数据导出与快照」中流式导出整表")
+                return
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                # 导出Excel
+                if excel_export_allowed(len(export_rank_data), export_cols):
+                    excel_data = export_to_excel(export_rank_data, file_prefix)
+                    st.download_button(
+                        label="📥 导出排名为Excel",
+                        data=excel_data,
+                        file_name=f"{file_prefix}.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
+                else:
+                    st.info("ℹ️ 数据量超出内存预算，Excel导出已停用，请使用CSV/Parquet")
+            with col2:
+                # 导出CSV
+                csv_data = export_to_csv(export_rank_data, file_prefix)
+                st.download_button(
+                    label="📥 导出排名为CSV",
+                    data=csv_data,
+                    file_name=f"{file_prefix}.csv",
+                    mime="text/csv"
+                )
+            with col3:
+                # 导出Parquet（供分析任务使用）
+                parquet_data = export_to_parquet(export_rank_data, file_prefix)
+                st.download_button(
+                    label="📥 导出排名为Parquet",
+                    data=parquet_data,
+                    file_name=f"{file_prefix}.parquet",
+                    mime="application/vnd.apache.parquet"
+                )
+            with col4:
+                # 导出Arrow IPC
+                arrow_data = export_to_arrow(export_rank_data, file_prefix)
+                st.download_button(
+                    label="📥 导出排名为Arrow",
+                    data=arrow_data,
+                    file_name=f"{file_prefix}.arrow",
+                    mime="application/vnd.apache.arrow.file"
+                )
+    
+    # 8. 班级+学科成绩统计
+    if menu == "班级+学科成绩统计":
+        st.subheader("📊 班级+学科成绩统计与可视化")
+        
+        with st.form("class_course_analysis_form"):
+            col1, col2 = st.columns(2)
+            class_name = col1.text_input("班级名称", placeholder="例如：计科2401")
+            course_id = col2.text_input("课程ID", placeholder="例如：C001")
+            compare_classes = st.checkbox("同时统计该课程全校各班级（各班部分结果合并为全校统计）")
+            analyze_btn = st.form_submit_button("统计并生成图表", type="primary")
+        
+        # 下载按钮不能放在表单内，结果在表单外展示
+        if analyze_btn:
+            if not (class_name and course_id):
+                st.warning("⚠️ 班级名称和课程ID不能为空！")
+                return
+            
+            # 按内存预算选择图表DPI
+            dpi = chart_dpi_for_budget()
+            if dpi is None:
+                st.error("❌ 内存预算不足，无法生成图表！")
+                return
+            
+            # 优先使用写入后预热好的统计和图表
+            report_key = class_course_report_key(class_name, course_id, dpi)
+            report = report_warmer.get(report_key)
+            if report is None:
+                try:
+                    version = data_version()
+                    # 同一班级+课程的并发统计只查询和绘图一次
+                    report = singleflight.do(
+                        report_key + (version,),
+                        lambda: compute_class_course_report(class_name, course_id, dpi, version)
+                    )
+                except Exception as e:
+                    st.error(f"统计失败：{str(e)}")
+                    return
+                report_warmer.put(report_key, report, version)
+            course_name = report["course_name"]
+            if course_name is None:
+                st.error("❌ 课程ID不存在！")
+                return
+            if report["stats"] is None:
+                st.info(f"ℹ️ {class_name}班暂无{course_name}（{course_id}）的成绩数据！")
+                return
+            img, stats = report["img"], report["stats"]
+            if dpi < CHART_DPI_LEVELS[0]:
+                st.info(f"ℹ️ 受内存预算限制，图表以{dpi} DPI生成")
+            
+            # 展示统计信息
+            st.subheader("📈 统计结果")
+            col1, col2 = st.columns(2)
+            summary = stats["summary"]
+            with col1:
+                st.metric("参与统计人数", stats["student_count"])
+                st.metric("学科平均分", stats["avg_score"])
+                st.metric("标准差", summary["std"])
+                st.write(f"最低分 {summary['min']} / 中位数 {summary['median']} / 最高分 {summary['max']}")
+                st.write(f"四分位数：P25 {summary['p25']}，P75 {summary['p75']}")
+            with col2:
+                st.write("### 成绩等级分布")
+                for level, count in stats["grade_distribution"].items():
+                    percentage = stats["grade_percentages"][level]
+                    st.write(f"- {level}：{count}人 ({percentage}%)")
+            
+            # 展示图表
+            st.subheader("📊 成绩可视化图表")
+            st.image(img, use_column_width=True)
+            
+            # 导出图表
+            st.download_button(
+                label="📥 下载成绩图表",
+                data=img,
+                file_name=f"{class_name}班{course_name}成绩统计.png",
+                mime="image/png"
+            )
+            
+            # 导出统计数据
+            stats_data = [
+                {"指标": "班级", "值": stats["class_name"]},
+                {"指标": "课程ID", "值": stats["course_id"]},
+                {"指标": "课程名称", "值": stats["course_name"]},
+                {"指标": "参与统计人数", "值": stats["student_count"]},
+                {"指标": "学科平均分", "值": stats["avg_score"]},
+                {"指标": "标准差", "值": summary["std"]},
+                {"指标": "最低分", "值": summary["min"]},
+                {"指标": "中位数", "值": summary["median"]},
+                {"指标": "最高分", "值": summary["max"]},
+                {"指标": "不及格人数", "值": f"{stats['grade_distribution']['不及格']}人 ({stats['grade_percentages']['不及格']}%)"},
+                {"指标": "及格人数", "值": f"{stats['grade_distribution']['及格']}人 ({stats['grade_percentages']['及格']}%)"},
+                {"指标": "良好人数", "值": f"{stats['grade_distribution']['良好']}人 ({stats['grade_percentages']['良好']}%)"},
+                {"指标": "优秀人数", "值": f"{stats['grade_distribution']['优秀']}人 ({stats['grade_percentages']['优秀']}%)"},
+            ]
+            excel_data = export_to_excel(stats_data, f"{class_name}班{course_name}成绩统计")
+            st.download_button(
+                label="📥 下载统计数据Excel",
+                data=excel_data,
+                file_name=f"{class_name}班{course_name}成绩统计.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+            parquet_data = export_to_parquet(stats_data, f"{class_name}班{course_name}成绩统计")
+            st.download_button(
+                label="📥 下载统计数据Parquet",
+                data=parquet_data,
+                file_name=f"{class_name}班{course_name}成绩统计.parquet",
+                mime="application/vnd.apache.parquet"
+            )
+            
+            # 全校各班级对比：一次扫描得到各班部分结果，合并得到全校统计
+            if compare_classes:
+                st.divider()
+                st.subheader(f"🏫 全校{course_name}（{course_id}）各班级统计")
+                try:
+                    version = data_version()
+                    partials = singleflight.do(
+                        ("课程分班统计", course_id, version),
+                        lambda: compute_course_class_stats(course_id, version)
+                    )
+                except Exception as e:
+                    st.error(f"全校统计失败：{str(e)}")
+                    return
+                class_rows = [
+                    {"班级": name, **partial.summary()}
+                    for name, partial in sorted(partials.items(), key=lambda x: str(x[0]))
+                ]
+                school = ScoreStats.merge_all(partials.values())
+                class_rows.append({"班级": "全校", **school.summary()})
+                class_rows = [{ScoreStats.SUMMARY_LABELS.get(k, k): v for k, v in row.items()} for row in class_rows]
+                st.dataframe(class_rows, use_container_width=True, hide_index=True)
+    
+    # 9. 成绩总表（学生×课程，所有人可看）
+    if menu == "成绩总表":
+        st.subheader("🧾 成绩总表（学生×课程）")
+        with st.form("score_matrix_form"):
+            col1, col2 = st.columns(2)
+            class_name = col1.text_input("班级名称（留空为全校）", placeholder="例如：计科2401")
+            course_filter = col2.text_input("课程ID（多个用逗号分隔，留空为全部）", placeholder="例如：C001,C002")
+            matrix_btn = st.form_submit_button("生成成绩总表", type="primary")
+        
+        if matrix_btn:
+            try:
+                sheet, course_mean = load_score_matrix(class_name.strip(), tuple(_split_ids(course_filter)), data_version())
+            except Exception as e:
+                st.error(f"成绩总表生成失败：{str(e)}")
+                return
+            if sheet.empty:
+                st.info("ℹ️ 没有符合条件的学生！")
+                return
+            
+            st.caption(f"共 {len(sheet)} 名学生，{len(course_mean)} 门课程")
+            st.dataframe(sheet, use_container_width=True, hide_index=True)
+            st.write("### 各课程平均分")
+            st.dataframe(course_mean.to_frame().T, use_container_width=True)
+            
+            # 导出成绩总表（按内存预算降级）
+            st.divider()
+            if not columnar_export_allowed(*sheet.shape):
+                st.warning("⚠️ 成绩总表超出单次请求内存预算，请缩小筛选范围后再导出")
+                return
+            file_prefix = f"{class_name.strip() or '全校'}成绩总表"
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                if excel_export_allowed(*sheet.shape):
+                    st.download_button(
+                        label="📥 导出总表为Excel",
+                        data=export_to_excel(sheet, file_prefix),
+                        file_name=f"{file_prefix}.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
+                else:
+                    st.info("ℹ️ 数据量超出内存预算，Excel导出已停用，请使用CSV/Parquet")
+            with col2:
+                st.download_button(
+                    label="📥 导出总表为CSV",
+                    data=export_to_csv(sheet, file_prefix),
+                    file_name=f"{file_prefix}.csv",
+                    mime="text/csv"
+                )
+            with col3:
+                st.download_button(
+                    label="📥 导出总表为Parquet",
+                    data=export_to_parquet(sheet, file_prefix),
+                    file_name=f"{file_prefix}.parquet",
+                    mime="application/vnd.apache.parquet"
+                )
+    
+    # 10. 数据导出与快照（仅管理员可操作）
+    if menu == "数据导出与快照":
+        st.subheader("🗄️ 数据导出与快照")
+        if st.session_state["role"] != "admin":
+            st.error("❌ 无权限！仅管理员可导出整表数据")
+            return
+        
+        snapshot_menu = st.radio("请选择操作", ["导出整表", "加载快照"])
+        
+        # 9.1 整表导出（流式游标 + 行组写入）
+        if snapshot_menu == "导出整表":
+            with st.form("export_table_form"):
+                col1, col2 = st.columns(2)
+                table_name = col1.selectbox("数据表", EXPORT_TABLES)
+                fmt = col2.selectbox("导出格式", ["parquet", "arrow"])
+                export_btn = st.form_submit_button("生成导出文件", type="primary")
+            
+            if export_btn:
+                db = connect_db(readonly=True)
+                if db:
+                    try:
+                        file_data = export_table_stream(db, table_name, fmt)
+                        st.download_button(
+                            label=f"📥 下载{table_name}表（{fmt}）",
+                            data=file_data,
+                            file_name=f"{table_name}.{fmt}",
+                            mime="application/vnd.apache.parquet" if fmt == "parquet" else "application/vnd.apache.arrow.file"
+                        )
+                    except Exception as e:
+                        st.error(f"导出失败：{str(e)}")
+                    finally:
+                        db.close()
+        
+        # 9.2 加载快照（离线分析）
+        elif snapshot_menu == "加载快照":
+            snapshot_file = st.file_uploader("上传Parquet/Arrow快照文件", type=["parquet", "arrow"])
+            if snapshot_file is not None:
+                try:
+                    df = load_snapshot(snapshot_file)
+                    st.caption(f"共 {len(df)} 行，{len(df.columns)} 列")
+                    st.dataframe(df, use_container_width=True)
+                    st.write("### 数值列概览")
+                    st.dataframe(df.describe(), use_container_width=True)
+                except Exception as e:
+                    st.error(f"快照加载失败：{str(e)}")
+
+def profile_report_sidebar():
+    """在侧边栏显示本次页面运行的性能分析结果"""
+    report = st.session_state.get("profile_report")
+    if not report:
+        return
+    with st.sidebar:
+        with st.expander("⏱️ 本次运行分析结果", expanded=True):
+            st.caption(f"{report['操作']} · {report['方式']} · 共 {report['耗时(秒)']} 秒")
+            if report.get("说明"):
+                st.caption(f"⚠️ {report['说明']}")
+            if report["热点函数"]:
+                st.dataframe(report["热点函数"], use_container_width=True, hide_index=True)
+            else:
+                st.write("运行时间过短，未采集到样本")
+            st.download_button(
+                label="📥 下载分析文件",
+                data=report["文件"],
+                file_name=f"profile_{report['时间']}.{report['扩展名']}",
+                mime="application/octet-stream",
+                key="download_profile"
+            )
+
+# ---------------------- 程序入口 ----------------------
+if __name__ == "__main__":
+    # 初始化session状态
+    if "is_login" not in st.session_state:
+        st.session_state["is_login"] = False
+    
+    # 安装依赖提示（首次运行）
+    if st.session_state.get("show_install_hint", True):
+        with st.expander("📝 首次运行请先安装依赖", expanded=False):
+            st.code("pip install pandas openpyxl matplotlib pillow pyarrow", language="bash")
+        st.session_state["show_install_hint"] = False
+    
+    # 未登录显示登录页，已登录显示主界面
+    if not st.session_state["is_login"]:
+        login_page()
+    else:
+        # 性能分析仅对管理员开放，未开启时不做任何分析
+        profile_mode = None
+        if st.session_state.get("role") == "admin" and st.session_state.get("profiling"):
+            profile_mode = st.session_state.get("profile_mode", PROFILE_MODES[0])
+        # 只保留本次运行的分析结果
+        st.session_state.pop("profile_report", None)
+        with track_memory(lambda: st.session_state.get("menu", "主界面")):
+            with profile_rerun(profile_mode, lambda: st.session_state.get("menu", "主界面")):
+                main_page()
+        if profile_mode is not None:
+            profile_report_sidebar()
\ No newline at end of file
@@ -0,0 +1,58 @@
+"""导出格式基准测试：比较 XLSX / CSV / Parquet / Arrow 的写入耗时与文件大小
+
+用法：python bench_export.py [行数]
+"""
+import sys
+import time
+
+import numpy as np
+
+from app import export_to_excel, export_to_csv, export_to_parquet, export_to_arrow
+
+
+def make_rank_data(n):
+    """生成与绩点排名导出结构一致的模拟数据"""
+    rng = np.random.default_rng(0)
+    gpas = np.round(rng.uniform(0, 5, n), 2)
+    return [
+        {
+            "排名": i + 1,
+            "学号": f"2024{i:06d}",
+            "姓名": f"学生{i}",
+            "班级": f"计科24{i % 40:02d}",
+            "平均绩点": float(gpas[i]),
+        }
+        for i in range(n)
+    ]
+
+
+def bench(name, func, data, repeat=3):
+    """返回最短写入耗时（秒）与文件大小（字节）"""
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func(data)
+        best = min(best, time.perf_counter() - start)
+        value = output.getvalue()
+        size = len(value.encode("utf-8") if isinstance(value, str) else value)
+    return name, best, size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    data = make_rank_data(n)
+    print(f"行数：{n}")
+    print(f"{'格式':<10}{'耗时(ms)':>12}{'大小(KB)':>12}")
+    for name, func in [
+        ("xlsx", export_to_excel),
+        ("csv", export_to_csv),
+        ("parquet", export_to_parquet),
+        ("arrow", export_to_arrow),
+    ]:
+        name, seconds, size = bench(name, func, data)
+        print(f"{name:<10}{seconds * 1000:>12.1f}{size / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
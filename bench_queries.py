@@ -0,0 +1,78 @@
+"""查询基准测试：在当前配置的数据库后端上运行页面使用的查询模板
+
+用法：
+    DB_BACKEND=sqlite SQLITE_PATH=bench.db python bench_queries.py --seed 2000
+    DB_BACKEND=mysql python bench_queries.py
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app import (
+    CLASS_COURSE_SCORES_SQL, DB_BACKEND, DB_PRIMARY, RANKING_SQL, STUDENT_INFO_SQL, STUDENT_SCORES_SQL,
+    _connect,
+)
+
+# 页面使用的查询模板（直接取自 app.py，页面查询修改后基准测试随之更新）
+QUERIES = {
+    "学生信息查询": (STUDENT_INFO_SQL, lambda ctx: (ctx["student_id"],)),
+    "学生成绩查询": (STUDENT_SCORES_SQL, lambda ctx: (ctx["student_id"],)),
+    "绩点排名": (RANKING_SQL, lambda ctx: ()),
+    "班级+学科成绩": (CLASS_COURSE_SCORES_SQL, lambda ctx: (ctx["class_name"], ctx["course_id"])),
+}
+
+def seed(db, students, courses):
+    """写入模拟数据（仅用于基准测试库）"""
+    rng = random.Random(0)
+    cursor = db.cursor()
+    cursor.executemany(
+        "INSERT INTO course (course_id, course_name, credit) VALUES (%s, %s, %s)",
+        [(f"C{j:03d}", f"课程{j}", rng.randint(1, 5)) for j in range(courses)]
+    )
+    cursor.executemany(
+        "INSERT INTO student (student_id, name, gender, class) VALUES (%s, %s, %s, %s)",
+        [(f"2024{i:06d}", f"学生{i}", rng.choice(["男", "女"]), f"计科24{i % 40:02d}") for i in range(students)]
+    )
+    cursor.executemany(
+        "INSERT INTO score (student_id, course_id, score) VALUES (%s, %s, %s)",
+        [(f"2024{i:06d}", f"C{j:03d}", rng.randint(0, 200) / 2) for i in range(students) for j in range(courses)]
+    )
+    db.commit()
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0, help="写入的模拟学生数（0表示不写入）")
+    parser.add_argument("--courses", type=int, default=10, help="写入的模拟课程数")
+    parser.add_argument("--repeat", type=int, default=50, help="每个查询的重复次数")
+    parser.add_argument("--student-id", default="2024000000")
+    parser.add_argument("--class-name", default="计科2400")
+    parser.add_argument("--course-id", default="C000")
+    args = parser.parse_args()
+    ctx = vars(args)
+
+    db = _connect(DB_PRIMARY)
+    if args.seed:
+        seed(db, args.seed, args.courses)
+
+    print(f"后端：{DB_BACKEND}")
+    print(f"{'查询':<16}{'p50(ms)':>10}{'p99(ms)':>10}")
+    cursor = db.cursor()
+    for name, (sql, params) in QUERIES.items():
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            cursor.execute(sql, params(ctx))
+            cursor.fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        print(f"{name:<16}{statistics.median(timings):>10.3f}{p99:>10.3f}")
+    cursor.close()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
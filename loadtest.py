@@ -0,0 +1,322 @@
+"""并发会话压测：在一个真实的 streamlit run 服务器上模拟多个教师同时使用系统
+
+每个模拟会话是一条独立的WebSocket连接，使用与浏览器相同的 /_stcore/stream 协议：
+先通过登录页登录，然后按权重随机访问各功能页面，统计不同并发数下的吞吐量以及各页面的 p50/p99 延迟。
+服务器在同一个进程中用线程运行各会话的脚本，会话之间共享缓存、请求合并和报表预热，与线上部署一致。
+
+    export SQLITE_ADMIN_PASSWORD=<管理员密码>
+    DB_BACKEND=sqlite SQLITE_PATH=bench.db python bench_queries.py --seed 2000
+    # 自动启动服务器（环境变量会传给服务器进程）
+    DB_BACKEND=sqlite SQLITE_PATH=bench.db python loadtest.py --launch --concurrency 1,4,16 --duration 30
+    # 压测已经运行的服务器
+    python loadtest.py --url http://localhost:8501 --concurrency 1,4,16 --duration 30
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from contextlib import contextmanager
+
+import websockets
+from streamlit.proto.Alert_pb2 import Alert
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+APP_FILE = "app.py"
+DEFAULT_MIX = "学生信息查询=4,绩点排名=2,班级+学科成绩统计=3,数据导出与快照=1"
+
+# 控件元素类型 -> 保存控件值的 WidgetState 字段（按钮为触发类控件，不保存值）
+WIDGET_VALUE_FIELDS = {
+    "text_input": "string_value",
+    "selectbox": "string_value",
+    "radio": "string_value",
+    "checkbox": "bool_value",
+    "button": None,
+}
+
+
+class AppSession:
+    """无界面的Streamlit会话：按标签查找控件，向服务器发送与浏览器相同的重跑消息"""
+
+    def __init__(self, websocket, timeout):
+        self._websocket = websocket
+        self._timeout = timeout
+        # 标签 -> (元素类型, 控件proto)，来自最近一次运行
+        self._widgets = {}
+        # 控件ID -> WidgetState，与浏览器一样在每次重跑时发送全部控件的当前值
+        self._states = {}
+
+    @classmethod
+    async def connect(cls, url, timeout):
+        stream_url = url.replace("http", "ws", 1).rstrip("/") + "/_stcore/stream"
+        websocket = await websockets.connect(
+            stream_url, subprotocols=["streamlit"], max_size=None, open_timeout=timeout
+        )
+        session = cls(websocket, timeout)
+        # 浏览器连接后先请求一次运行，得到首页（登录页）
+        await session.run()
+        return session
+
+    async def close(self):
+        await self._websocket.close()
+
+    @property
+    def labels(self):
+        return set(self._widgets)
+
+    def _widget(self, label):
+        if label not in self._widgets:
+            raise LookupError(f"页面上没有标签为「{label}」的控件")
+        return self._widgets[label]
+
+    def set(self, label, value):
+        """修改控件的值，下次重跑时发送（表单内控件在浏览器中也是提交时才发送）"""
+        kind, widget = self._widget(label)
+        field = WIDGET_VALUE_FIELDS[kind]
+        if field is None:
+            raise TypeError(f"「{label}」是按钮，请使用 click")
+        state = WidgetState(id=widget.id)
+        setattr(state, field, value)
+        self._states[widget.id] = state
+
+    async def click(self, label):
+        """点击按钮（含表单提交按钮）并等待本次运行结束"""
+        kind, widget = self._widget(label)
+        if kind != "button":
+            raise TypeError(f"「{label}」不是按钮")
+        await self.run(WidgetState(id=widget.id, trigger_value=True))
+
+    async def run(self, trigger=None):
+        """请求一次重跑并等待脚本运行结束，页面上出现异常或错误提示时抛出异常"""
+        msg = BackMsg()
+        msg.rerun_script.widget_states.widgets.extend(self._states.values())
+        if trigger is not None:
+            msg.rerun_script.widget_states.widgets.append(trigger)
+        await self._websocket.send(msg.SerializeToString())
+
+        widgets, errors = {}, []
+        while True:
+            data = await asyncio.wait_for(self._websocket.recv(), self._timeout)
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                # 每次运行（包括脚本内 st.rerun 触发的运行）开始时重新收集页面元素
+                widgets, errors = {}, []
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type == "exception":
+                    errors.append(element.exception.message)
+                elif element_type == "alert" and element.alert.format == Alert.ERROR:
+                    errors.append(element.alert.body)
+                elif element_type in WIDGET_VALUE_FIELDS:
+                    widget = getattr(element, element_type)
+                    widgets[widget.label] = (element_type, widget)
+            elif kind == "script_finished" and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                break
+
+        self._widgets = widgets
+        # 与浏览器一致：只保留仍在页面上的控件的值
+        ids = {widget.id for _, widget in widgets.values()}
+        self._states = {widget_id: state for widget_id, state in self._states.items() if widget_id in ids}
+        if errors:
+            raise RuntimeError(errors[0])
+
+
+async def login(session, username, password):
+    session.set("账号", username)
+    session.set("密码", password)
+    await session.click("登录")
+    if "请选择功能" not in session.labels:
+        raise RuntimeError("登录失败")
+
+
+async def open_menu(session, page):
+    session.set("请选择功能", page)
+    await session.run()
+
+
+async def page_student(session, args):
+    await open_menu(session, "学生信息查询")
+    session.set("请输入学生学号", args.student_id)
+    await session.click("查询")
+
+
+async def page_ranking(session, args):
+    await open_menu(session, "绩点排名")
+    await session.click("刷新排名")
+
+
+async def page_statistics(session, args):
+    await open_menu(session, "班级+学科成绩统计")
+    session.set("班级名称", args.class_name)
+    session.set("课程ID", args.course_id)
+    await session.click("统计并生成图表")
+
+
+async def page_export(session, args):
+    await open_menu(session, "数据导出与快照")
+    session.set("数据表", args.export_table)
+    await session.click("生成导出文件")
+
+
+PAGES = {
+    "学生信息查询": page_student,
+    "绩点排名": page_ranking,
+    "班级+学科成绩统计": page_statistics,
+    "数据导出与快照": page_export,
+}
+
+
+def parse_mix(spec):
+    """解析页面权重，格式："页面=权重,页面=权重" """
+    mix = {}
+    for item in spec.split(","):
+        page, _, weight = item.partition("=")
+        if page.strip() not in PAGES:
+            raise ValueError(f"未知页面：{page}")
+        mix[page.strip()] = float(weight or 1)
+    return mix
+
+
+async def new_session(args, results, errors):
+    """建立新会话并登录，失败时返回None"""
+    session = None
+    try:
+        start = time.perf_counter()
+        session = await AppSession.connect(args.url, args.timeout)
+        await login(session, args.username, args.password)
+        results["登录"].append(time.perf_counter() - start)
+        return session
+    except Exception as e:
+        errors["登录"] += 1
+        print(f"会话登录失败：{e}")
+        if session is not None:
+            await session.close()
+        return None
+
+
+async def session_worker(args, mix, seed, results, errors):
+    """单个模拟会话：登录后按权重循环访问页面 duration 秒，页面出错后重新登录"""
+    rng = random.Random(seed)
+    pages, weights = list(mix), list(mix.values())
+    session = await new_session(args, results, errors)
+    deadline = time.perf_counter() + args.duration
+    while session is not None and time.perf_counter() < deadline:
+        page = rng.choices(pages, weights)[0]
+        start = time.perf_counter()
+        try:
+            await PAGES[page](session, args)
+        except Exception as e:
+            errors[page] += 1
+            if errors[page] == 1:
+                print(f"{page}出错：{e}")
+            # 出错后页面状态不可预期，换一个新会话继续
+            await session.close()
+            session = await new_session(args, results, errors)
+            continue
+        results[page].append(time.perf_counter() - start)
+    if session is not None:
+        await session.close()
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def run_level(args, mix, concurrency):
+    results = defaultdict(list)
+    errors = defaultdict(int)
+    await asyncio.gather(*(
+        session_worker(args, mix, i, results, errors) for i in range(concurrency)
+    ))
+
+    # 每个会话在登录后运行 duration 秒，吞吐量按压测时长计算
+    completed = sum(len(v) for page, v in results.items() if page != "登录")
+    print(f"\n并发会话数：{concurrency}  吞吐量：{completed / args.duration:.2f} 次/秒")
+    print(f"{'页面':<14}{'次数':>8}{'错误':>8}{'p50(ms)':>12}{'p99(ms)':>12}")
+    for page in ["登录", *mix]:
+        timings = results.get(page, [])
+        if timings:
+            p50 = percentile(timings, 0.5) * 1000
+            p99 = percentile(timings, 0.99) * 1000
+            print(f"{page:<14}{len(timings):>8}{errors[page]:>8}{p50:>12.1f}{p99:>12.1f}")
+        else:
+            print(f"{page:<14}{0:>8}{errors[page]:>8}{'-':>12}{'-':>12}")
+
+
+@contextmanager
+def launch_server(port, timeout):
+    """以无界面模式启动 streamlit run，健康检查通过后返回地址，结束时关闭服务器"""
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", APP_FILE,
+            "--server.headless=true", f"--server.port={port}", "--browser.gatherUsageStats=false",
+        ],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://localhost:{port}"
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError("Streamlit服务器启动失败")
+            try:
+                with urllib.request.urlopen(f"{url}/_stcore/health", timeout=1):
+                    break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("等待Streamlit服务器启动超时")
+                time.sleep(0.2)
+        yield url
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+async def run_levels(args, mix):
+    for level in [int(n) for n in args.concurrency.split(",")]:
+        await run_level(args, mix, level)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="学生成绩管理系统并发压测")
+    parser.add_argument("--url", default="http://localhost:8501", help="被压测的Streamlit服务器地址")
+    parser.add_argument("--launch", action="store_true", help="自动启动本地服务器（忽略 --url）")
+    parser.add_argument("--port", type=int, default=8599, help="--launch 时服务器使用的端口")
+    parser.add_argument("--username", default="admin", help="登录账号（数据导出页需要管理员）")
+    parser.add_argument("--password", default=os.environ.get("SQLITE_ADMIN_PASSWORD"),
+                        help="登录密码，默认取 SQLITE_ADMIN_PASSWORD（SQLite库创建管理员时使用的密码）")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="逐级测试的并发会话数")
+    parser.add_argument("--duration", type=float, default=20, help="每个并发级别的持续秒数")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="页面访问权重")
+    parser.add_argument("--timeout", type=float, default=60, help="单次页面运行超时秒数")
+    parser.add_argument("--student-id", default="2024000000")
+    parser.add_argument("--class-name", default="计科2400")
+    parser.add_argument("--course-id", default="C000")
+    parser.add_argument("--export-table", default="score")
+    args = parser.parse_args()
+    if not args.password:
+        parser.error("请通过 --password 或 SQLITE_ADMIN_PASSWORD 提供登录密码")
+
+    mix = parse_mix(args.mix)
+    if args.launch:
+        with launch_server(args.port, args.timeout) as url:
+            args.url = url
+            asyncio.run(run_levels(args, mix))
+    else:
+        asyncio.run(run_levels(args, mix))
+
+
+if __name__ == "__main__":
+    main()
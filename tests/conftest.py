@@ -0,0 +1,12 @@
+"""测试环境：app.py 在导入时读取环境变量，这里先指向临时SQLite数据库和进程内缓存"""
+import os
+import sys
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="grade_test_")
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(_tmp, "grade_management.db")
+os.environ["SQLITE_ADMIN_PASSWORD"] = "test-admin"
+os.environ["CACHE_BACKEND"] = "memory"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
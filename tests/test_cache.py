@@ -0,0 +1,241 @@
+import pickle
+import sqlite3
+
+import numpy as np
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import app
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path, monkeypatch):
+    if request.param == "memory":
+        return app.MemoryCacheBackend(max_bytes=1 << 20)
+    if request.param == "sqlite":
+        return app.SQLiteCacheBackend(str(tmp_path / "cache.db"), max_bytes=1 << 20)
+    # redis为可选依赖，未安装时跳过Redis后端的用例
+    redis = pytest.importorskip("redis")
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(redis, "Redis", fakeredis.FakeRedis)
+    return app.RedisCacheBackend("redis://localhost:6379/0")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(app.time, "time", lambda: now[0])
+    return now
+
+
+def test_report_values_round_trip(backend):
+    report = {
+        "course_name": "高等数学",
+        "img": b"\x89PNG\r\n\x1a\n\x00\xff",
+        "stats": {"student_count": np.int64(3), "avg_score": np.float64(81.5), "summary": {"median": 80.0}},
+    }
+    backend.set(("report", 2, "班级+学科成绩统计", "计科2401", "C001", 300, 7), report)
+    assert backend.get(("report", 2, "班级+学科成绩统计", "计科2401", "C001", 300, 7)) == {
+        "course_name": "高等数学",
+        "img": b"\x89PNG\r\n\x1a\n\x00\xff",
+        "stats": {"student_count": 3, "avg_score": 81.5, "summary": {"median": 80.0}},
+    }
+    assert backend.get(("report", 2, "其他")) is None
+
+
+def test_pickled_payload_is_not_loaded(backend, monkeypatch):
+    # 缓存中被写入的pickle数据不会被反序列化执行，按未命中处理
+    monkeypatch.setattr(app, "dump_cache_value", lambda value: pickle.dumps(value))
+    backend.set("k", {"a": 1})
+    assert backend.get("k") is None
+
+
+def test_shared_counter_only_moves_forward(backend):
+    assert backend.counter("data_version") == 0
+    backend.advance("data_version", 5)
+    backend.advance("data_version", 3)
+    assert backend.counter("data_version") == 5
+    backend.advance("data_version", 6)
+    assert backend.counter("data_version") == 6
+    assert backend.counter("other") == 0
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"], indirect=True)
+def test_ttl_expires_entries(backend, clock):
+    backend.set("short", 1, ttl=10)
+    backend.set("forever", 2)
+    clock[0] += 9
+    assert backend.get("short") == 1
+    clock[0] += 2
+    assert backend.get("short") is None
+    assert backend.get("forever") == 2
+
+
+@pytest.mark.parametrize("backend", ["redis"], indirect=True)
+def test_ttl_is_set_on_redis_keys(backend):
+    backend.set("short", 1, ttl=10)
+    backend.set("forever", 2)
+    client = backend._client
+    assert 0 < client.ttl(backend.PREFIX + "short") <= 10
+    assert client.ttl(backend.PREFIX + "forever") == -1
+
+
+@pytest.mark.parametrize("backend_cls", ["memory", "sqlite"])
+def test_lru_evicts_least_recently_used(backend_cls, tmp_path, clock):
+    value = "x" * 400
+    size = len(app.dump_cache_value(value))
+    if backend_cls == "memory":
+        cache = app.MemoryCacheBackend(max_bytes=size * 3)
+    else:
+        cache = app.SQLiteCacheBackend(str(tmp_path / "lru.db"), max_bytes=size * 3)
+    for key in ("a", "b", "c"):
+        clock[0] += 1
+        cache.set(key, value)
+    clock[0] += 1
+    assert cache.get("a") == value
+    clock[0] += 1
+    cache.set("d", value)
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ("a", "c", "d")] == [value] * 3
+
+
+def test_stale_report_format_is_not_read(monkeypatch):
+    # 旧结构的排名（没有学分加权绩点）留在共享缓存中时，新代码不会读到它
+    cache = app.MemoryCacheBackend(max_bytes=1 << 20)
+    monkeypatch.setattr(app, "get_cache", lambda: cache)
+    version = app.data_version()
+    cache.set(("report",) + app.RANKING_REPORT + (version,), [{"学号": "S1", "平均绩点": 3.0}])
+    warmer = app.ReportWarmer(debounce_seconds=60, concurrency=1)
+    assert warmer.get(app.RANKING_REPORT) is None
+    rows = [{"学号": "S1", "平均绩点": 3.0, "学分加权绩点": 3.2}]
+    warmer.put(app.RANKING_REPORT, rows, version)
+    assert warmer.get(app.RANKING_REPORT) == rows
+
+
+class BrokenBackend:
+    """模拟不可用的缓存后端（Redis断开、缓存文件被锁）"""
+    def __init__(self):
+        self.calls = 0
+        self.broken = True
+        self.inner = app.MemoryCacheBackend(max_bytes=1 << 20)
+
+    def __getattr__(self, method):
+        def call(*args):
+            self.calls += 1
+            if self.broken:
+                raise ConnectionError("缓存不可用")
+            return getattr(self.inner, method)(*args)
+        return call
+
+
+@pytest.fixture
+def monotonic(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(app.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_broken_backend_reads_as_miss(monotonic):
+    cache = app.FailSoftCache(BrokenBackend, cooldown_seconds=10)
+    cache.set("k", 1)
+    assert cache.get("k") is None
+    assert cache.counter("data_version") == 0
+    # 本进程的写入仍推进版本号
+    cache.advance("data_version", 3)
+    assert cache.counter("data_version") == 3
+
+
+def test_broken_backend_is_skipped_during_cooldown(monotonic):
+    backend = BrokenBackend()
+    cache = app.FailSoftCache(lambda: backend, cooldown_seconds=10)
+    assert cache.get("k") is None
+    assert backend.calls == 1
+    assert cache.get("k") is None
+    assert backend.calls == 1
+    monotonic[0] += 11
+    assert cache.get("k") is None
+    assert backend.calls == 2
+
+
+def test_failed_backend_creation_reads_as_miss(monotonic):
+    def create():
+        raise ConnectionError("缓存不可用")
+
+    cache = app.FailSoftCache(create, cooldown_seconds=10)
+    assert cache.get("k") is None
+    assert cache.counter("data_version") == 0
+
+
+def test_version_does_not_go_back_after_backend_recovers(monotonic):
+    backend = BrokenBackend()
+    backend.broken = False
+    backend.inner.advance("data_version", 2)
+    cache = app.FailSoftCache(lambda: backend, cooldown_seconds=10)
+    assert cache.counter("data_version") == 2
+    backend.broken = True
+    cache.advance("data_version", 5)
+    assert cache.counter("data_version") == 5
+    monotonic[0] += 11
+    backend.broken = False
+    # 恢复后使用本进程推进过的版本号，并补写到共享后端
+    assert cache.counter("data_version") == 5
+    assert backend.inner.counter("data_version") == 5
+
+
+@pytest.fixture
+def unreachable_cache_page(tmp_path, monkeypatch):
+    pytest.importorskip("redis")
+    path = tmp_path / "pages.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(app.SQLITE_SCHEMA)
+    conn.execute("INSERT INTO student VALUES ('S1', '张三', '男', '计科2401')")
+    conn.execute("INSERT INTO course VALUES ('C001', '高等数学', 4)")
+    conn.execute("INSERT INTO score (student_id, course_id, score) VALUES ('S1', 'C001', 90)")
+    conn.commit()
+    conn.close()
+    monkeypatch.setenv("SQLITE_PATH", str(path))
+    # 端口1上没有Redis服务，连接被拒绝
+    monkeypatch.setenv("CACHE_BACKEND", "redis")
+    monkeypatch.setenv("CACHE_REDIS_URL", "redis://127.0.0.1:1/0")
+    monkeypatch.setenv("CACHE_TIMEOUT_SECONDS", "0.2")
+    # 缓存后端是进程内单例，换成不可用的Redis前后都要清掉
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    at = AppTest.from_file("../app.py", default_timeout=30)
+    at.session_state["is_login"] = True
+    at.session_state["username"] = "admin"
+    at.session_state["role"] = "admin"
+    yield at, path
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+def _widget(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def test_write_succeeds_when_cache_is_unreachable(unreachable_cache_page):
+    at, path = unreachable_cache_page
+    at.run()
+    _widget(at.selectbox, "请选择功能").select("修改学生信息").run()
+    _widget(at.text_input, "学生学号").input("S1")
+    _widget(at.text_input, "新姓名").input("张三丰")
+    _widget(at.text_input, "新班级").input("计科2401")
+    _widget(at.button, "提交修改").click().run()
+    assert not at.exception
+    assert not at.error
+    assert "信息修改成功" in at.success[0].value
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT name FROM student WHERE student_id = 'S1'").fetchone() == ("张三丰",)
+    conn.close()
+
+
+def test_ranking_page_works_when_cache_is_unreachable(unreachable_cache_page):
+    at, _ = unreachable_cache_page
+    at.run()
+    _widget(at.selectbox, "请选择功能").select("绩点排名").run()
+    _widget(at.button, "刷新排名").click().run()
+    assert not at.exception
+    assert not at.error
+    assert at.dataframe[0].value["学号"].tolist() == ["S1"]
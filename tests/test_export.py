@@ -0,0 +1,42 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import app
+
+
+@pytest.fixture
+def db():
+    conn = app._connect_sqlite()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM score")
+    cursor.execute("DELETE FROM student")
+    conn.commit()
+    yield conn
+    cursor.execute("DELETE FROM score")
+    cursor.execute("DELETE FROM student")
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_stream_export_nullable_column_empty_in_first_row_group(db, fmt):
+    # 前两个行组的成绩全为空，后面才出现数值
+    rows = [(f"2024{i:06d}", "C001", None if i < 10 else i / 2) for i in range(13)]
+    db.cursor().executemany("INSERT INTO score (student_id, course_id, score) VALUES (%s, %s, %s)", rows)
+    db.commit()
+
+    output = app.export_table_stream(db, "score", fmt, row_group_size=5)
+    if fmt == "parquet":
+        table = pq.read_table(output)
+    else:
+        table = pa.ipc.open_file(output).read_all()
+
+    assert table.schema == app.EXPORT_SCHEMAS["score"]
+    assert table.column("score").to_pylist() == [row[2] for row in rows]
+
+
+def test_stream_export_empty_table_keeps_schema(db):
+    table = pq.read_table(app.export_table_stream(db, "student", "parquet"))
+    assert table.num_rows == 0
+    assert table.schema == app.EXPORT_SCHEMAS["student"]
@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def primary(tmp_path, monkeypatch):
+    """SQLite主库的连接池，记录新建的连接数"""
+    path = tmp_path / "fanout.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(app.SQLITE_SCHEMA)
+    conn.executemany(
+        "INSERT INTO student VALUES (?, ?, '男', ?)",
+        [(f"S{i}", f"学生{i}", "计科2401" if i % 2 else "计科2402") for i in range(10)]
+    )
+    conn.execute("INSERT INTO course VALUES ('C001', '高等数学', 3)")
+    conn.executemany("INSERT INTO score VALUES (?, 'C001', ?)", [(f"S{i}", 60 + i * 4) for i in range(10)])
+    conn.commit()
+    conn.close()
+
+    connects = []
+
+    def connect():
+        connects.append(path)
+        return app.SQLiteConnection(sqlite3.connect(path, check_same_thread=False))
+
+    pools = {"primary": app.ConnectionPool(connect, 4), "replica": None}
+    monkeypatch.setattr(app, "_connection_pools", lambda: pools)
+    return pools, connects
+
+
+def test_results_come_back_in_query_order(primary):
+    # 第一条查询最慢，结果仍按提交顺序返回
+    slow = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200000) SELECT MAX(i) FROM n"
+    results = app.fetch_concurrently([
+        (slow, ()),
+        ("SELECT name FROM student WHERE student_id = %s", ("S3",)),
+        ("SELECT COUNT(*) FROM score", ()),
+        ("SELECT course_name FROM course WHERE course_id = %s", ("C001",)),
+    ])
+    assert [list(rows) for rows in results] == [[(200000,)], [("学生3",)], [(10,)], [("高等数学",)]]
+
+
+def test_consume_reads_through_the_cursor(primary):
+    course_rows, stats = app.fetch_concurrently([
+        (app.COURSE_NAME_SQL, ("C001",)),
+        (app.CLASS_COURSE_SCORES_SQL, ("计科2401", "C001"), app.ScoreStats.from_cursor),
+    ])
+    assert list(course_rows) == [("高等数学",)]
+    expected = app.ScoreStats()
+    expected.update(60 + i * 4 for i in range(1, 10, 2))
+    assert stats.summary() == expected.summary()
+
+
+def test_connection_is_released_after_failing_query(primary):
+    pools, connects = primary
+    with pytest.raises(sqlite3.OperationalError):
+        app.fetch_concurrently([("SELECT * FROM missing_table", ())])
+    assert len(pools["primary"]._idle) == 1
+    # 失败查询归还的连接被下一条查询复用
+    assert list(app.fetch_concurrently([("SELECT COUNT(*) FROM student", ())])[0]) == [(10,)]
+    assert len(connects) == 1
+    assert len(pools["primary"]._idle) == 1
+
+
+def test_unreachable_replica_falls_back_to_primary(primary):
+    pools, connects = primary
+    attempts = []
+
+    def connect_replica():
+        attempts.append("replica")
+        raise ConnectionError("副本不可用")
+
+    pools["replica"] = app.ConnectionPool(connect_replica, 4)
+    results = app.fetch_concurrently([
+        ("SELECT COUNT(*) FROM student", ()),
+        ("SELECT COUNT(*) FROM score", ()),
+    ])
+    assert [list(rows) for rows in results] == [[(10,)], [(10,)]]
+    assert attempts == ["replica", "replica"]
+    assert len(connects) >= 1
+
+
+def test_non_readonly_queries_skip_the_replica(primary):
+    pools, _ = primary
+    attempts = []
+    pools["replica"] = app.ConnectionPool(lambda: attempts.append("replica"), 4)
+    assert list(app.fetch_concurrently([("SELECT COUNT(*) FROM course", ())], readonly=False)[0]) == [(1,)]
+    assert attempts == []
@@ -0,0 +1,89 @@
+import copy
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+import app
+
+
+def old_gpa(score):
+    """查找表引入前的逐个换算公式"""
+    score = float(score)
+    if score < 60:
+        return 0.0
+    score -= 60
+    return min(1 + score / 10, 4.0) if score < 30 else 4 + (score - 30) / 10
+
+
+STEPS = np.arange(201) * 0.5
+RANDOM_SCORES = np.concatenate([
+    np.random.default_rng(20240601).uniform(0, 100, 1000),
+    np.round(np.random.default_rng(20240602).uniform(0, 100, 1000) * 2) / 2,
+])
+
+
+def test_table_matches_old_formula_on_every_step():
+    assert len(app.GPA_TABLE) == len(STEPS)
+    expected = np.array([old_gpa(s) for s in STEPS])
+    assert np.abs(app.GPA_TABLE - expected).max() == 0.0
+
+
+@pytest.mark.parametrize("scores", [STEPS, RANDOM_SCORES], ids=["steps", "random"])
+def test_gpa_functions_match_old_formula(scores):
+    expected = np.array([old_gpa(s) for s in scores])
+    assert np.abs(np.array([app.calculate_gpa(s) for s in scores]) - expected).max() == 0.0
+    assert np.abs(app.calculate_gpa_array(scores) - expected).max() == 0.0
+
+
+def test_gpa_accepts_decimal_and_string_scores():
+    # MySQL的DECIMAL列读出为Decimal
+    assert app.calculate_gpa(Decimal("85.5")) == old_gpa(85.5)
+    assert app.calculate_gpa("72") == old_gpa(72)
+
+
+def test_missing_score_keeps_nan_gpa():
+    gpa = app.calculate_gpa_array([90, np.nan, 59.5])
+    assert gpa[0] == old_gpa(90) and np.isnan(gpa[1]) and gpa[2] == 0.0
+
+
+def test_average_gpa_skips_missing_scores_and_credits():
+    # 学生0：90分(3学分)、缺失成绩(2学分)；学生1：75分(缺失学分)、60分(1学分)；学生2没有成绩；学生3只有缺失成绩
+    codes = [0, 0, 1, 1, 3]
+    scores = [90, np.nan, 75, 60, np.nan]
+    credits = [3, 2, np.nan, 1, 4]
+    result = app.average_gpa(codes, 4, scores, credits)
+    np.testing.assert_array_equal(result["简单平均"], [old_gpa(90), (old_gpa(75) + old_gpa(60)) / 2, 0.0, 0.0])
+    np.testing.assert_array_equal(result["学分加权"], [old_gpa(90), old_gpa(60), 0.0, 0.0])
+
+
+def test_average_gpa_weights_by_credit():
+    result = app.average_gpa([0, 0], 1, [95, 70], [4, 1])
+    assert result["学分加权"][0] == pytest.approx((old_gpa(95) * 4 + old_gpa(70)) / 5)
+    assert result["简单平均"][0] == pytest.approx((old_gpa(95) + old_gpa(70)) / 2)
+
+
+@pytest.fixture
+def rank_data():
+    return [
+        {"学号": "S1", "平均绩点": 3.0, "学分加权绩点": 3.6},
+        {"学号": "S2", "平均绩点": 3.5, "学分加权绩点": 3.1},
+        {"学号": "S3", "平均绩点": 3.0, "学分加权绩点": 2.0},
+    ]
+
+
+@pytest.mark.parametrize("mode, order", [
+    # 绩点相同时保持原有顺序
+    ("简单平均", ["S2", "S1", "S3"]),
+    ("学分加权", ["S1", "S2", "S3"]),
+])
+def test_rank_by_gpa(rank_data, mode, order):
+    ranked = app.rank_by_gpa(rank_data, mode)
+    assert [row["学号"] for row in ranked] == order
+    assert [row["排名"] for row in ranked] == [1, 2, 3]
+
+
+def test_rank_by_gpa_does_not_modify_input(rank_data):
+    original = copy.deepcopy(rank_data)
+    app.rank_by_gpa(rank_data, "学分加权")
+    assert rank_data == original
@@ -0,0 +1,45 @@
+import threading
+import tracemalloc
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def tracing():
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    yield
+    app.MEMORY_STATS.clear()
+    if started:
+        tracemalloc.stop()
+
+
+def test_concurrent_measurement_does_not_reset_other_peak(tracing):
+    allocated = threading.Event()
+    other_done = threading.Event()
+
+    def big_action():
+        with app.track_memory("大操作"):
+            block = bytearray(20 * 1024 * 1024)
+            del block
+            allocated.set()
+            # 另一个会话在此期间开始测量；串行化后它要等本次测量结束
+            other_done.wait(timeout=0.5)
+
+    def small_action():
+        allocated.wait()
+        with app.track_memory("小操作"):
+            pass
+        other_done.set()
+
+    threads = [threading.Thread(target=big_action), threading.Thread(target=small_action)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert app.MEMORY_STATS["大操作"]["最大峰值(MB)"] >= 19
+    assert app.MEMORY_STATS["小操作"]["次数"] == 1
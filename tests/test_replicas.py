@@ -0,0 +1,180 @@
+import sqlite3
+import time
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def replicas(monkeypatch):
+    endpoints = [{"host": "replica-a", "port": 3306}, {"host": "replica-b", "port": 3306}]
+    attempts = []
+    down = {"replica-a"}
+
+    def fake_connect(endpoint):
+        attempts.append(endpoint["host"])
+        if endpoint["host"] in down:
+            raise ConnectionError(endpoint["host"])
+        return endpoint["host"]
+
+    monkeypatch.setattr(app, "DB_REPLICAS", endpoints)
+    monkeypatch.setattr(app, "_connect", fake_connect)
+    monkeypatch.setattr(app, "replica_health", app.EndpointHealth(cooldown_seconds=60))
+    return attempts, down
+
+
+def test_failed_replica_is_skipped_during_cooldown(replicas):
+    attempts, _ = replicas
+    for _ in range(20):
+        assert app._connect_replica() == "replica-b"
+    # 失败的副本最多尝试一次，之后进入冷却期
+    assert attempts.count("replica-a") <= 1
+
+
+def test_all_replicas_down_raises_without_retrying(replicas):
+    attempts, down = replicas
+    down.add("replica-b")
+    with pytest.raises(ConnectionError):
+        app._connect_replica()
+    assert sorted(attempts) == ["replica-a", "replica-b"]
+    with pytest.raises(RuntimeError):
+        app._connect_replica()
+    assert len(attempts) == 2
+
+
+def test_replica_available_again_after_cooldown(replicas, monkeypatch):
+    attempts, down = replicas
+    app.replica_health.mark_down(app.DB_REPLICAS[1])
+    down.clear()
+    assert app._connect_replica() == "replica-a"
+    now = app.time.monotonic()
+    monkeypatch.setattr(app.time, "monotonic", lambda: now + 61)
+    assert {app._connect_replica() for _ in range(20)} == {"replica-a", "replica-b"}
+
+
+def test_replica_endpoints_use_short_connect_timeout():
+    replicas = app._parse_replicas("r1:3307, r2")
+    assert [r["connect_timeout"] for r in replicas] == [app.REPLICA_CONNECT_TIMEOUT] * 2
+    assert "connect_timeout" not in app.DB_PRIMARY
+
+
+@pytest.fixture
+def replicated(tmp_path, monkeypatch):
+    """主库和一个只读副本（两个SQLite文件），replicate() 把主库当前内容复制到副本"""
+    paths = {"primary": str(tmp_path / "primary.db"), "replica": str(tmp_path / "replica.db")}
+    routes = []
+
+    class RoutedConnection(app.SQLiteConnection):
+        """记录每条查询实际在哪个库上执行：连接池会复用连接，不能只在建立连接时记录"""
+        def __init__(self, host):
+            super().__init__(sqlite3.connect(paths[host], check_same_thread=False))
+            self._host = host
+
+        def cursor(self, cursor_class=None):
+            cursor = super().cursor(cursor_class)
+            execute = cursor.execute
+
+            def routed(sql, params=()):
+                # 读取副本的数据版本标记不算作分析查询
+                if "data_marker" not in sql:
+                    routes.append(self._host)
+                return execute(sql, params)
+
+            cursor.execute = routed
+            return cursor
+
+    def fake_connect(endpoint):
+        return RoutedConnection(endpoint["host"])
+
+    monkeypatch.setattr(app, "DB_BACKEND", "mysql")
+    monkeypatch.setattr(app, "DB_PRIMARY", {"host": "primary", "port": 3306})
+    monkeypatch.setattr(app, "DB_REPLICAS", [{"host": "replica", "port": 3306}])
+    monkeypatch.setattr(app, "_connect", fake_connect)
+    monkeypatch.setattr(app, "_mysql_data_marker", lambda: True)
+    monkeypatch.setattr(app, "replica_health", app.EndpointHealth(cooldown_seconds=60))
+    pools = {
+        "primary": app.ConnectionPool(lambda: fake_connect(app.DB_PRIMARY), 2),
+        "replica": app.ConnectionPool(app._connect_replica, 2),
+    }
+    monkeypatch.setattr(app, "_connection_pools", lambda: pools)
+    cache = app.MemoryCacheBackend(max_bytes=1 << 20)
+    # 版本号取唯一值，避免命中其他用例按版本号缓存的结果
+    cache.advance("data_version", time.time_ns())
+    monkeypatch.setattr(app, "get_cache", lambda: cache)
+
+    primary = sqlite3.connect(paths["primary"])
+    primary.executescript(app.SQLITE_SCHEMA)
+    primary.execute("INSERT INTO student VALUES ('S1', '张三', '男', '计科2401')")
+    primary.execute("INSERT INTO course VALUES ('C001', '高等数学', 3)")
+    primary.execute("INSERT INTO score VALUES ('S1', 'C001', 90)")
+    primary.commit()
+    primary.close()
+
+    def write(sql, params=()):
+        """按页面写入路径在主库执行一次写入，返回新的数据版本号"""
+        db = app.SQLiteConnection(sqlite3.connect(paths["primary"]))
+        try:
+            db.cursor().execute(sql, params)
+            version = app.bump_data_marker(db)
+            db.commit()
+        finally:
+            db.close()
+        cache.advance("data_version", version)
+        return version
+
+    def replicate():
+        src, dst = sqlite3.connect(paths["primary"]), sqlite3.connect(paths["replica"])
+        src.backup(dst)
+        src.close()
+        dst.close()
+
+    replicate()
+    routes.clear()
+    return write, replicate, routes
+
+
+@pytest.mark.parametrize("fill", [
+    lambda version: app.load_score_matrix("", (), version),
+    lambda version: app.get_student_index(version),
+    lambda version: app.load_class_names(version),
+    lambda version: app.compute_ranking(version),
+    lambda version: app.compute_class_course_report("计科2401", "C001", 72, version),
+    lambda version: app.compute_course_class_stats("C001", version),
+])
+def test_version_keyed_results_use_replica_only_when_caught_up(fill, replicated):
+    write, replicate, routes = replicated
+    # 副本落后于缓存键中的版本：回退到主库，避免把旧数据缓存为新版本的结果
+    fill(write("UPDATE score SET score = 50 WHERE student_id = 'S1'"))
+    assert routes and set(routes) == {"primary"}
+    # 副本追上后，分析查询不再占用主库
+    version = write("UPDATE score SET score = 60 WHERE student_id = 'S1'")
+    replicate()
+    routes.clear()
+    fill(version)
+    assert routes and set(routes) == {"replica"}
+
+
+def test_lagging_replica_result_reflects_primary(replicated):
+    write, _, _ = replicated
+    version = write("UPDATE score SET score = 50 WHERE student_id = 'S1'")
+    assert app.compute_ranking(version)[0]["平均绩点"] == 0.0
+    version = write("UPDATE score SET score = 85 WHERE student_id = 'S1'")
+    assert app.compute_ranking(version)[0]["平均绩点"] == app.calculate_gpa(85)
+
+
+def test_data_marker_version_always_moves_past_cached_version(replicated, monkeypatch):
+    write, _, _ = replicated
+    current = app.data_version()
+    # 标记（初始为0）落后于缓存中的版本号时，新版本号仍大于当前版本号
+    assert write("DELETE FROM score WHERE course_id = 'none'") == current + 1
+    assert write("DELETE FROM score WHERE course_id = 'none'") == current + 2
+    # 缓存重置（如Redis重启）后，版本号继续沿标记递增，不会回到旧值
+    cache = app.MemoryCacheBackend(max_bytes=1 << 20)
+    monkeypatch.setattr(app, "get_cache", lambda: cache)
+    assert write("DELETE FROM score WHERE course_id = 'none'") == current + 3
+
+
+def test_replica_without_marker_is_treated_as_stale(tmp_path):
+    conn = app.SQLiteConnection(sqlite3.connect(str(tmp_path / "empty.db")))
+    assert app.replica_version(conn) == -1
@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+import pytest
+
+import app
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "SQLITE_PATH", str(tmp_path / "matrix.db"))
+    conn = app._connect_sqlite()
+    cursor = conn.cursor()
+    cursor.executemany("INSERT INTO student VALUES (%s, %s, %s, %s)", [
+        ("S1", "张三", "男", "计科2401"),
+        ("S2", "李四", "女", "计科2401"),
+        ("S3", "王五", "男", "计科2402"),  # 没有成绩
+    ])
+    cursor.executemany("INSERT INTO course VALUES (%s, %s, %s)", [
+        ("C001", "高等数学", 4),
+        ("C002", "大学英语", None),  # 缺失学分
+    ])
+    cursor.executemany("INSERT INTO score VALUES (%s, %s, %s)", [
+        ("S1", "C001", 90), ("S1", "C002", 70), ("S1", "C009", 60),  # C009 课程已被删除
+        ("S2", "C001", 55), ("S2", "C002", None),
+    ])
+    conn.commit()
+    conn.close()
+    # 版本号取唯一值，避免命中其他用例按版本号缓存的结果
+    return time.time_ns()
+
+
+def _cell(sheet, student_id, column):
+    return sheet.loc[sheet["学号"] == student_id, column].iloc[0]
+
+
+def test_pivot_keeps_every_student_and_score(db):
+    sheet, course_mean = app.load_score_matrix("", (), db)
+    assert list(sheet["学号"]) == ["S1", "S2", "S3"]
+    assert list(sheet.columns) == [
+        "学号", "姓名", "班级", "高等数学（C001）", "大学英语（C002）", "已删除课程（C009）", "平均绩点", "学分加权绩点",
+    ]
+    assert _cell(sheet, "S1", "已删除课程（C009）") == 60
+    assert np.isnan(_cell(sheet, "S2", "大学英语（C002）"))
+    assert np.isnan(_cell(sheet, "S3", "高等数学（C001）"))
+    assert course_mean["高等数学（C001）"] == 72.5
+    assert course_mean["大学英语（C002）"] == 70
+
+
+def test_gpa_columns_match_ranking(db):
+    sheet, _ = app.load_score_matrix("", (), db)
+    ranking = {row["学号"]: row for row in app.compute_ranking(db)}
+    for student_id in ranking:
+        for column in app.GPA_MODES.values():
+            assert _cell(sheet, student_id, column) == ranking[student_id][column]
+    # 简单平均计入已删除课程的成绩；缺失学分的课程不参与加权；没有成绩的学生为0
+    gpa = app.calculate_gpa
+    assert _cell(sheet, "S1", "平均绩点") == round((gpa(90) + gpa(70) + gpa(60)) / 3, 2)
+    assert _cell(sheet, "S1", "学分加权绩点") == round(gpa(90), 2)
+    assert _cell(sheet, "S3", "平均绩点") == 0
+
+
+def test_class_and_course_filters(db):
+    sheet, course_mean = app.load_score_matrix("计科2401", ("C001",), db)
+    assert list(sheet["学号"]) == ["S1", "S2"]
+    assert list(course_mean.index) == ["高等数学（C001）"]
+    assert list(sheet["平均绩点"]) == [round(app.calculate_gpa(90), 2), round(app.calculate_gpa(55), 2)]
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from app import ScoreStats
+
+
+@pytest.fixture
+def scores():
+    rng = np.random.default_rng(35)
+    # 0.5分粒度的成绩，含满分和0分
+    values = np.round(np.clip(rng.normal(72, 15, 2001), 0, 100) * 2) / 2
+    values[:3] = [0, 100, 100]
+    return values
+
+
+def _split(values, parts, rng):
+    cuts = np.sort(rng.choice(np.arange(1, len(values)), parts - 1, replace=False))
+    return np.split(values, cuts)
+
+
+@pytest.mark.parametrize("parts", [1, 2, 7, 40])
+def test_merge_all_matches_numpy(scores, parts):
+    rng = np.random.default_rng(parts)
+    partials = []
+    for chunk in _split(rng.permutation(scores), parts, rng):
+        stats = ScoreStats()
+        # 每个部分结果也分块累加，空块和None被忽略
+        for block in np.array_split(chunk, 3):
+            stats.update(list(block) + [None])
+        partials.append(stats)
+    partials.append(ScoreStats())
+    merged = ScoreStats.merge_all(partials)
+
+    assert merged.count == len(scores)
+    assert merged.mean == pytest.approx(np.mean(scores))
+    assert merged.std == pytest.approx(np.std(scores))
+    assert (merged.min, merged.max) == (scores.min(), scores.max())
+    for q in (0.25, 0.5, 0.75):
+        # 分位数取所在0.5分区间的下限
+        exact = np.quantile(scores, q, method="inverted_cdf")
+        assert exact - ScoreStats.BIN_WIDTH < merged.quantile(q) <= exact
+    assert abs(merged.quantile(0.5) - np.median(scores)) <= ScoreStats.BIN_WIDTH
+
+
+def test_merge_all_equals_single_pass(scores):
+    single = ScoreStats().update(scores)
+    merged = ScoreStats.merge_all(ScoreStats().update(chunk) for chunk in np.array_split(scores, 5))
+    assert merged.summary() == single.summary()
+    assert merged.grade_distribution() == single.grade_distribution()
+
+
+def test_grade_distribution_counts_every_score(scores):
+    levels = ScoreStats().update(scores).grade_distribution()
+    assert sum(levels.values()) == len(scores)
+    assert levels["优秀"] == int((scores >= 90).sum())
+    assert levels["不及格"] == int((scores < 60).sum())
+
+
+def test_from_cursor_reads_in_chunks(scores):
+    class Cursor:
+        def __init__(self, rows):
+            self.rows = rows
+
+        def fetchmany(self, size):
+            chunk, self.rows = self.rows[:size], self.rows[size:]
+            return chunk
+
+    stats = ScoreStats.from_cursor(Cursor([(float(v),) for v in scores]), chunk_size=64)
+    assert stats.count == len(scores)
+    assert stats.mean == pytest.approx(np.mean(scores))
+
+
+def test_empty_stats():
+    assert ScoreStats.merge_all([]).summary() == {"count": 0}
+    assert ScoreStats().quantile(0.5) is None
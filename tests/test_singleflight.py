@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+import app
+
+
+class Interrupted(BaseException):
+    """模拟Streamlit的 RerunException/StopException（BaseException子类）"""
+
+
+def _run_coalesced(flight, fn, waiters):
+    """发起一次由 fn 计算的请求，在其计算期间再发起 waiters 个相同请求，返回各请求的结果或异常"""
+    started, release = threading.Event(), threading.Event()
+    outcomes = {}
+
+    def leader_fn():
+        started.set()
+        release.wait(5)
+        return fn()
+
+    def request(name, compute):
+        try:
+            outcomes[name] = flight.do(("报表", 1), compute)
+        except BaseException as e:
+            outcomes[name] = e
+
+    threads = [threading.Thread(target=request, args=("leader", leader_fn))]
+    threads[0].start()
+    started.wait(5)
+    threads += [threading.Thread(target=request, args=(i, lambda: "不应执行")) for i in range(waiters)]
+    for thread in threads[1:]:
+        thread.start()
+    # 等所有等待者都挂到进行中的计算上再放行
+    deadline = time.monotonic() + 5
+    while flight.stats()["报表"]["合并请求"] < waiters and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+
+def test_concurrent_requests_share_one_computation():
+    flight = app.SingleFlight()
+    outcomes = _run_coalesced(flight, lambda: {"排名": [1, 2]}, waiters=4)
+    assert len(outcomes) == 5
+    assert all(value is outcomes["leader"] for value in outcomes.values())
+    assert flight.stats() == {"报表": {"请求数": 5, "实际计算": 1, "合并请求": 4}}
+    # 计算结束后相同的键重新计算
+    assert flight.do(("报表", 1), lambda: "新结果") == "新结果"
+    assert flight.stats()["报表"]["实际计算"] == 2
+
+
+def test_error_is_raised_in_leader_and_waiters():
+    flight = app.SingleFlight()
+
+    def fail():
+        raise ValueError("数据库连接失败")
+
+    outcomes = _run_coalesced(flight, fail, waiters=3)
+    assert all(isinstance(e, ValueError) for e in outcomes.values())
+
+
+def test_control_flow_exception_stays_with_leader():
+    flight = app.SingleFlight()
+
+    def interrupt():
+        raise Interrupted()
+
+    outcomes = _run_coalesced(flight, interrupt, waiters=3)
+    assert isinstance(outcomes.pop("leader"), Interrupted)
+    for error in outcomes.values():
+        assert isinstance(error, RuntimeError)
+        assert isinstance(error.__cause__, Interrupted)
+
+
+def test_single_request_exception_propagates():
+    flight = app.SingleFlight()
+    with pytest.raises(Interrupted):
+        flight.do(("报表", 1), lambda: (_ for _ in ()).throw(Interrupted()))
+    # 中断的计算不会残留，下一次请求重新计算
+    assert flight.do(("报表", 1), lambda: 42) == 42
@@ -0,0 +1,54 @@
+import sqlite3
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import app
+
+
+@pytest.fixture
+def fresh_sqlite(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "SQLITE_PATH", str(tmp_path / "fresh.db"))
+    return monkeypatch
+
+
+def _users():
+    conn = app._connect_sqlite()
+    try:
+        return conn.execute("SELECT username, password, role FROM user").fetchall()
+    finally:
+        conn.close()
+
+
+def test_no_admin_account_without_configured_password(fresh_sqlite):
+    fresh_sqlite.setattr(app, "SQLITE_ADMIN_PASSWORD", "")
+    assert _users() == []
+    assert app.sqlite_missing_admin()
+
+
+def test_admin_account_uses_configured_password(fresh_sqlite):
+    fresh_sqlite.setattr(app, "SQLITE_ADMIN_PASSWORD", "s3cret")
+    assert _users() == [("admin", "s3cret", "admin")]
+    assert not app.sqlite_missing_admin()
+
+
+def test_schema_is_initialized_once_across_reruns(tmp_path, monkeypatch):
+    # 每次重跑都会重新执行app.py，建表和管理员检查仍只在进程内第一次连接时执行
+    executed = []
+    connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(executed.append)
+        return conn
+
+    monkeypatch.setattr(sqlite3, "connect", traced_connect)
+    monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "reruns.db"))
+    # 未设置管理员密码时登录页每次运行都会连接数据库检查账号
+    monkeypatch.setenv("SQLITE_ADMIN_PASSWORD", "")
+    at = AppTest.from_file("../app.py", default_timeout=30)
+    for _ in range(3):
+        at.run()
+        assert not at.exception
+    assert sum("CREATE TABLE IF NOT EXISTS user" in sql for sql in executed) == 1
+    assert at.warning
@@ -0,0 +1,87 @@
+import sqlite3
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import app
+
+INDEX_QUERY = "SELECT student_id, name, class FROM student"
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    """记录页面运行期间执行的SQL"""
+    executed = []
+    connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(executed.append)
+        return conn
+
+    monkeypatch.setattr(sqlite3, "connect", traced_connect)
+    conn = app._connect_sqlite()
+    try:
+        conn.execute("INSERT OR IGNORE INTO student (student_id, name, class) VALUES ('S900001', '检索甲', '检索班1')")
+        conn.execute("INSERT OR IGNORE INTO student (student_id, name, class) VALUES ('S900002', '检索乙', '检索班2')")
+        conn.commit()
+    finally:
+        conn.close()
+    # AppTest以 __main__ 重新执行app.py，页面的缓存与测试中导入的app模块不共享；
+    # 清空进程内全部Streamlit缓存，页面不会命中之前用例按同一版本号缓存的索引和班级列表
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    executed.clear()
+    return executed
+
+
+def _student_page():
+    at = AppTest.from_file("../app.py", default_timeout=30)
+    at.session_state["is_login"] = True
+    at.session_state["username"] = "admin"
+    at.session_state["role"] = "admin"
+    return at.run()
+
+
+def test_landing_page_does_not_build_search_index(queries):
+    at = _student_page()
+    assert not at.exception
+    class_box = next(box for box in at.selectbox if box.label == "班级")
+    assert {"检索班1", "检索班2"} <= set(class_box.options)
+    assert not any(INDEX_QUERY in sql for sql in queries)
+
+
+def test_class_filter_builds_index_and_searches(queries):
+    at = _student_page()
+    next(box for box in at.selectbox if box.label == "班级").select("检索班2").run()
+    assert not at.exception
+    assert any(INDEX_QUERY in sql for sql in queries)
+    assert list(at.dataframe[0].value["学号"]) == ["S900002"]
+
+
+class CountingKeys(list):
+    """记录按下标读取次数的有序键数组"""
+    reads = 0
+
+    def __getitem__(self, index):
+        CountingKeys.reads += 1
+        return super().__getitem__(index)
+
+
+def test_prefix_scan_is_bounded_when_class_filter_matches_nothing():
+    rows = [(f"2024{i:06d}", f"学生{i}", f"计科24{i % 40:02d}") for i in range(20000)]
+    index = app.StudentSearchIndex(rows)
+    index._id_keys, index._name_keys = CountingKeys(index._id_keys), CountingKeys(index._name_keys)
+    CountingKeys.reads = 0
+    assert index.search("学生", "不存在的班级") == []
+    # 两个有序数组各最多扫描 MAX_PREFIX_SCAN 个键，另加二分查找的读取
+    assert CountingKeys.reads <= 2 * (index.MAX_PREFIX_SCAN + 32)
+
+
+def test_match_beyond_prefix_scan_limit_is_found_by_substring(monkeypatch):
+    monkeypatch.setattr(app.StudentSearchIndex, "MAX_PREFIX_SCAN", 10)
+    rows = [(f"S{i:03d}", f"学生{i:03d}", "计科2401") for i in range(99)] + [("S099", "学生099", "计科2402")]
+    index = app.StudentSearchIndex(rows)
+    assert index.search("学生", "计科2402") == [{"学号": "S099", "姓名": "学生099", "班级": "计科2402"}]
+    assert len(index.search("学生", limit=50)) == 50
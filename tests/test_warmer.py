@@ -0,0 +1,125 @@
+import sqlite3
+import threading
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import app
+
+DPI = app.chart_dpi_for_budget() or app.CHART_DPI_LEVELS[-1]
+REPORT_A = app.class_course_report_key("计科2401", "C001", DPI)
+REPORT_B = app.class_course_report_key("计科2402", "C001", DPI)
+
+
+@pytest.fixture
+def warmer(monkeypatch):
+    """已缓存过两个班级报表的预热器，记录 _flush 提交的报表而不真正计算"""
+    warmer = app.ReportWarmer(debounce_seconds=60, concurrency=1)
+    for key in (REPORT_A, REPORT_B):
+        warmer._reports[key] = {"version": 0, "computed_at": None, "seconds": 0.0, "state": "已完成"}
+    submitted = []
+    monkeypatch.setattr(warmer, "_submit", lambda key, version, fn: submitted.append(key))
+
+    def flush():
+        warmer._timer.cancel()
+        warmer._flush()
+        return set(submitted)
+
+    return warmer, flush
+
+
+def test_write_without_score_changes_only_rewarms_ranking(warmer):
+    warmer, flush = warmer
+    warmer.notify(scores_changed=False)
+    assert flush() == {app.RANKING_REPORT}
+
+
+def test_class_change_rewarms_old_and_new_class(warmer):
+    warmer, flush = warmer
+    warmer.notify(class_name="计科2401")
+    warmer.notify(class_name="计科2402")
+    assert flush() == {app.RANKING_REPORT, REPORT_A, REPORT_B}
+
+
+def test_score_change_rewarms_only_its_class_and_course(warmer):
+    warmer, flush = warmer
+    warmer.notify(class_name="计科2402", course_id="C001")
+    assert flush() == {app.RANKING_REPORT, REPORT_B}
+
+
+class WarmerTimer:
+    """代替预热器的防抖定时器：记录登记的写入，不启动后台预热"""
+    def __init__(self, interval, function):
+        self.function = function
+
+    def start(self):
+        pass
+
+    def cancel(self):
+        pass
+
+    @property
+    def pending(self):
+        # AppTest以 __main__ 重新执行app.py，页面使用的预热器不是测试中导入的 app.report_warmer
+        return self.function.__self__._pending
+
+
+@pytest.fixture
+def admin_page(tmp_path, monkeypatch):
+    path = tmp_path / "pages.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(app.SQLITE_SCHEMA)
+    conn.execute("INSERT INTO student VALUES ('S1', '张三', '男', '计科2401')")
+    conn.commit()
+    conn.close()
+    monkeypatch.setenv("SQLITE_PATH", str(path))
+    created = []
+    real_timer = threading.Timer
+
+    def timer(interval, function, *args, **kwargs):
+        # Streamlit自身也使用 threading.Timer，只替换预热器的定时器
+        if getattr(function, "__name__", None) != "_flush":
+            return real_timer(interval, function, *args, **kwargs)
+        created.append(WarmerTimer(interval, function))
+        return created[-1]
+
+    monkeypatch.setattr(threading, "Timer", timer)
+
+    at = AppTest.from_file("../app.py", default_timeout=30)
+    at.session_state["is_login"] = True
+    at.session_state["username"] = "admin"
+    at.session_state["role"] = "admin"
+    yield at, created
+    # 预热器是进程内单例，清掉本用例登记而未预热的写入
+    for warmer_timer in created:
+        warmer_timer.pending.clear()
+
+
+def _widget(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def test_student_page_notifies_old_and_new_class(admin_page):
+    at, timers = admin_page
+    at.run()
+    _widget(at.selectbox, "请选择功能").select("修改学生信息").run()
+    _widget(at.text_input, "学生学号").input("S1")
+    _widget(at.text_input, "新姓名").input("张三")
+    _widget(at.text_input, "新班级").input("计科2402")
+    _widget(at.button, "提交修改").click().run()
+    assert not at.exception
+    assert "信息修改成功" in at.success[0].value
+    assert timers[-1].pending == [("计科2401", None, None), ("计科2402", None, None)]
+
+
+def test_adding_student_only_rewarms_ranking(admin_page):
+    at, timers = admin_page
+    at.run()
+    _widget(at.selectbox, "请选择功能").select("新增学生").run()
+    _widget(at.text_input, "学号").input("S2")
+    _widget(at.text_input, "姓名").input("李四")
+    _widget(at.text_input, "班级").input("计科2401")
+    _widget(at.button, "提交新增").click().run()
+    assert not at.exception
+    # 仍会安排一次预热（重算排名），但不登记任何班级+课程
+    assert timers and timers[-1].pending == []